@@ -1,36 +1,467 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 import json
+import math
 import os
-from optimization_engine import generate_timetable
+import time
+from optimization_engine import (DEFAULT_SOLVER_PROFILE, TimeTableUtils, generate_timetable, load_instance,
+                                 repair_timetable, solver_profile)
+from jobs import FINISHED_STATUSES, JobManager, JobManagerUnavailable
+from cache import ResultCache, instance_fingerprint
+from models import db
+import store
+from views import VIEW_KINDS, TimetableViews, ViewCache
+from serialization import stream_compact
+from feasibility import InfeasibleInstanceError, analyze_instance, diagnose_infeasibility
+from config import (JOB_WORKERS, JOB_RETENTION, JOB_LOCK_FILE, CACHE_MAX_ENTRIES, CACHE_DIR, OBJECTIVE_WEIGHTS, SOLVER_PROFILE,
+                    SQLALCHEMY_DATABASE_URI, SQLALCHEMY_ENGINE_OPTIONS, VIEW_CACHE_ENTRIES)
 
 app = Flask(__name__)
+app.config["SQLALCHEMY_DATABASE_URI"] = SQLALCHEMY_DATABASE_URI
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = SQLALCHEMY_ENGINE_OPTIONS
+db.init_app(app)
 
 from flask_cors import CORS
 CORS(app)
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), "sample_data.json")
-data_store = {}
+tables_ready = False
+job_manager = None
+result_cache = ResultCache(max_entries=CACHE_MAX_ENTRIES, directory=CACHE_DIR)
+view_cache = ViewCache(max_entries=VIEW_CACHE_ENTRIES)
+
+
+@app.before_request
+def ensure_tables():
+    # Created on first use rather than at import so the app imports without a database
+    global tables_ready
+    if not tables_ready:
+        db.create_all()
+        tables_ready = True
+
+
+def current_data():
+    """The stored instance as a raw dict payload, or None if nothing has been loaded."""
+    return store.load_data() if store.has_data() else None
+
+
+def get_job_manager():
+    # Created lazily so importing the app doesn't spin up the process pool. The registry
+    # is per process, so only one app process may create it (see JOB_LOCK_FILE).
+    global job_manager
+    if job_manager is None:
+        job_manager = JobManager(max_workers=JOB_WORKERS, retention=JOB_RETENTION, lock_path=JOB_LOCK_FILE)
+    return job_manager
+
+
+@app.errorhandler(JobManagerUnavailable)
+def job_manager_unavailable(e):
+    return jsonify({"error": str(e)}), 503
+
+
+# Per-request "solver" settings: (type, smallest allowed value, whether null is allowed)
+SOLVER_PARAM_TYPES = {
+    "max_time": (float, 0.1, False),
+    "workers": (int, 1, False),
+    "total_time": (float, 0.1, True),
+    "relative_gap": (float, 0.0, True),
+    "no_improvement_time": (float, 0.1, True),
+}
+
+
+# Instance-shape settings of a generation request: (default, type, smallest allowed value)
+GENERATION_PARAM_TYPES = {
+    "days": (5, int, 1),
+    "periods_per_day": (6, int, 1),
+    "num_variants": (1, int, 1),
+    "max_classes_per_day": (4, int, 1),
+}
+
+
+def number_param(label, value, kind, minimum):
+    """value coerced to kind (int or float); raises ValueError naming `label` if it isn't one or is below minimum."""
+    try:
+        number = float(value) if isinstance(value, (int, float, str)) and not isinstance(value, bool) else None
+    except ValueError:
+        number = None
+    if number is None or not math.isfinite(number) or (kind is int and not number.is_integer()):
+        raise ValueError(f"{label} must be a{'n integer' if kind is int else ' number'}")
+    if number < minimum:
+        raise ValueError(f"{label} must be at least {minimum}")
+    return kind(number)
+
+
+def solver_params(payload):
+    """
+    The request's "solver" settings over the deployment profile. Only DEFAULT_SOLVER_PROFILE
+    keys are accepted, coerced to numbers; a request can't use more search workers than
+    the deployment allows. Raises ValueError for anything else.
+    """
+    overrides = payload.get("solver") or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("solver must be an object")
+    profile = dict(SOLVER_PROFILE)
+    for name, value in overrides.items():
+        if name not in DEFAULT_SOLVER_PROFILE:
+            raise ValueError(f"Unknown solver setting {name!r}, expected one of {sorted(DEFAULT_SOLVER_PROFILE)}")
+        kind, minimum, nullable = SOLVER_PARAM_TYPES[name]
+        if value is None and nullable:
+            profile[name] = None
+            continue
+        profile[name] = number_param(f"solver.{name}", value, kind, minimum)
+    profile["workers"] = min(profile.get("workers", SOLVER_PROFILE["workers"]), SOLVER_PROFILE["workers"])
+    return profile
+
+
+def generation_params(payload):
+    """Generation settings of a request, with defaults; raises ValueError for invalid ones."""
+    if not isinstance(payload, dict):
+        raise ValueError("The request body must be a JSON object")
+    params = {name: number_param(name, payload.get(name, default), kind, minimum)
+              for name, (default, kind, minimum) in GENERATION_PARAM_TYPES.items()}
+    params.update({
+        "formulation": payload.get("formulation", "assignment"),
+        "sharded": bool(payload.get("sharded", False)),
+        "engine": payload.get("engine", "cpsat"),
+        "weights": OBJECTIVE_WEIGHTS,
+        "profile": solver_params(payload),
+    })
+    return params
+
+
+def complete_result(solutions, params, metrics):
+    """
+    Whether a generation result is the full answer for its params, so it may be cached and
+    found by fingerprint: every requested variant was found, or the search for the next one
+    was proven infeasible (fewer distinct timetables exist). Timeouts are not.
+    """
+    expected = 1 if params["engine"] == "portfolio" else params["num_variants"]
+    if len(solutions) >= expected:
+        return True
+    variants = (metrics or {}).get("variants") or []
+    return bool(variants) and variants[-1]["status"] == "INFEASIBLE"
+
+
+def solutions_response(solutions, session_map, fmt="full", batch_sizes=None, **extra):
+    """
+    jsonify the full payload, or with fmt="compact" stream serialization.stream_compact:
+    msgpack if the client accepts application/msgpack best, gzip if it accepts gzip.
+    batch_sizes: {batch_id: size} of the instance, for the compact format.
+    """
+    if fmt != "compact":
+        return jsonify(dict(extra, solutions=solutions, sessions=session_map))
+    mimetype = request.accept_mimetypes.best_match(["application/json", "application/msgpack"]) or "application/json"
+    encoding = "msgpack" if mimetype == "application/msgpack" else "json"
+    gzip = "gzip" in request.accept_encodings
+    try:
+        chunks = stream_compact(solutions, session_map, extra=extra, encoding=encoding, gzip=gzip,
+                                batch_sizes=batch_sizes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 406
+    response = Response(chunks, mimetype=mimetype)
+    if gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    return response
 
 @app.route("/api/sample-data/load", methods=["POST"])
 def load_sample_data():
-    global data_store
     with open(DATA_FILE, "r") as f:
-        data_store = json.load(f)
-    return jsonify({"status": "ok", "message": "Sample data loaded", "counts": {k: v for k,v in data_store.items()}})
+        counts = store.import_data(json.load(f), replace=True)
+    return jsonify({"status": "ok", "message": "Sample data loaded", "counts": counts})
+
+@app.route("/api/import", methods=["POST"])
+def import_data():
+    """
+    Bulk import: uploaded .json/.csv files (multipart, entity kind from the file name or
+    the "kind" field) or a JSON payload body. replace=true empties the named tables first.
+    """
+    replace = request.args.get("replace", request.form.get("replace", "false")).lower() in ("1", "true", "yes")
+    try:
+        if request.files:
+            payload = {}
+            for upload in request.files.values():
+                parsed = store.parse_import_file(upload.filename, upload.read(), kind=request.form.get("kind"))
+                for kind, rows in parsed.items():
+                    payload.setdefault(kind, []).extend(rows)
+        else:
+            payload = request.get_json(force=True)
+        counts = store.import_data(payload, replace=replace)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": f"Import failed: {e}"}), 400
+    return jsonify({"status": "ok", "counts": counts})
 
 @app.route("/api/generate", methods=["POST"])
 def generate():
-    global data_store
-    if not data_store:
+    data = current_data()
+    if not data:
+        return jsonify({"error": "No data loaded"}), 400
+
+    payload = request.get_json(force=True)
+    try:
+        params = generation_params(payload)
+        key = instance_fingerprint(data, params)
+    except ValueError as e:  # invalid solver settings, or a curriculum load_instance rejects
+        return jsonify({"error": str(e)}), 400
+    cached = result_cache.get(key)
+    if cached is not None:
+        solutions, session_map = cached
+    else:
+        metrics = {}
+        try:
+            solutions, session_map = generate_timetable(data, metrics=metrics, **params)
+        except InfeasibleInstanceError as e:
+            return jsonify({"error": str(e), "report": e.report}), 422
+        except ValueError as e:  # unknown engine/formulation, or a model the formulation can't express
+            return jsonify({"error": str(e)}), 400
+        if not complete_result(solutions, params, metrics):
+            key = None  # a timeout, not the answer for these params
+        if key is not None:
+            result_cache.put(key, solutions, session_map)
+    timetable_id = store.save_timetable(solutions, session_map, params["days"], params["periods_per_day"], fingerprint=key,
+                                        reuse=cached is not None, room_ids=[r["id"] for r in data["rooms"]])
+    return solutions_response(solutions, session_map, fmt=request.args.get("format") or payload.get("format", "full"),
+                              batch_sizes={b["id"]: b["size"] for b in data["batches"]}, timetable_id=timetable_id)
+
+@app.route("/api/analyze", methods=["POST"])
+def analyze():
+    """
+    Demand/supply report of the stored instance (milliseconds); with "diagnose": true a
+    CP-SAT search for a minimal set of conflicting constraint groups is added.
+    """
+    data = current_data()
+    if not data:
         return jsonify({"error": "No data loaded"}), 400
-    
     payload = request.get_json(force=True)
-    days = payload.get("days", 5)
-    periods_per_day = payload.get("periods_per_day", 6)
-    num_variants = payload.get("num_variants", 1)
+    try:
+        params = generation_params(payload)
+        rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    utils = TimeTableUtils(days=params["days"], periods_per_day=params["periods_per_day"])
+    max_classes_per_day = params["max_classes_per_day"]
+    report = analyze_instance(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                              max_classes_per_day=max_classes_per_day)
+    if payload.get("diagnose") and report["ok"]:
+        report["diagnosis"] = diagnose_infeasibility(rooms, faculties, batches, subjects, utils,
+                                                     fixed_slots=fixed_slots, max_classes_per_day=max_classes_per_day,
+                                                     time_limit=solver_profile(params["profile"])["max_time"])
+    return jsonify(report)
+
+@app.route("/api/repair", methods=["POST"])
+def repair():
+    data = current_data()
+    if not data:
+        return jsonify({"error": "No data loaded"}), 400
+
+    payload = request.get_json(force=True)
+    previous_solution = payload.get("previous_solution")
+    if not previous_solution:
+        return jsonify({"error": "previous_solution is required"}), 400
+    try:
+        params = generation_params(payload)
+        solution, diff, session_map = repair_timetable(
+            data, [tuple(a) for a in previous_solution], changed=payload.get("changed"),
+            days=params["days"], periods_per_day=params["periods_per_day"],
+            max_classes_per_day=params["max_classes_per_day"], mode=payload.get("mode", "fix"),
+            weights=params["weights"], profile=params["profile"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if solution is None:
+        return jsonify({"error": "No feasible repair found"}), 422
+    return jsonify({"solution": solution, "diff": diff, "sessions": session_map})
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    data = current_data()
+    if not data:
+        return jsonify({"error": "No data loaded"}), 400
+
+    payload = request.get_json(force=True)
+    try:
+        params = generation_params(payload)
+        key = instance_fingerprint(data, params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cached = result_cache.get(key)
+    # kept with the job (and pruned with it) until the finished result has been stored
+    info = {"key": key, "params": params, "cache_hit": cached is not None, "timetable_id": None,
+            "room_ids": [r["id"] for r in data["rooms"]], "batch_sizes": {b["id"]: b["size"] for b in data["batches"]}}
+    if cached is not None:
+        job_id = get_job_manager().submit_completed(*cached, num_variants=params["num_variants"], info=info)
+    else:
+        job_id = get_job_manager().submit(data, info=info, **params)
+    return jsonify({"job_id": job_id}), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    status = get_job_manager().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(status)
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    status, solutions, session_map = get_job_manager().result(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if solutions is None:
+        # Still queued/running, or failed; a failure with a feasibility report (infeasible
+        # data) is the client's to fix, like in /api/generate
+        if status["status"] == "failed":
+            return jsonify(status), 422 if status.get("report") is not None else 500
+        return jsonify(status), 409
+    info = get_job_manager().info(job_id)
+    if info["timetable_id"] is None and status["status"] == "done":
+        key, params, cache_hit = info["key"], info["params"], info["cache_hit"]
+        # an accepted job stopped early, so its result is not the full answer for these params
+        complete = cache_hit or (not status.get("accepted") and
+                                 complete_result(solutions, params, get_job_manager().metrics(job_id)))
+        if complete and not cache_hit:
+            result_cache.put(key, solutions, session_map)
+        info["timetable_id"] = store.save_timetable(solutions, session_map, params["days"], params["periods_per_day"],
+                                                    fingerprint=key if complete else None, reuse=cache_hit,
+                                                    room_ids=info["room_ids"])
+    return solutions_response(solutions, session_map, fmt=request.args.get("format", "full"),
+                              batch_sizes=info["batch_sizes"], status=status, timetable_id=info["timetable_id"])
+
+@app.route("/api/jobs/<job_id>/metrics", methods=["GET"])
+def job_metrics(job_id):
+    status = get_job_manager().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    progress = get_job_manager().progress(job_id)
+    return jsonify({"status": status, "metrics": get_job_manager().metrics(job_id), "incumbents": progress[1]})
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """
+    Server-sent events: an "incumbent" event (info plus solution) for every improving
+    solution and a "status" event whenever the status changes; the stream ends with the job.
+    Timetables are extracted at most every jobs.INCUMBENT_INTERVAL seconds, so incumbents
+    in between carry solution null.
+    """
+    if get_job_manager().status(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def stream():
+        sent, last_status = 0, None
+        # incumbent timetables are only extracted while a stream watches the job
+        with get_job_manager().watch(job_id):
+            while True:
+                progress = get_job_manager().progress(job_id)
+                if progress is None:
+                    return
+                status, incumbents, latest = progress
+                for i, info in enumerate(incumbents[sent:], start=sent):
+                    # only the latest extracted incumbent's timetable is available, and it is
+                    # only sent with its own incumbent
+                    solution = latest[1] if latest is not None and latest[0] == i else None
+                    yield f"event: incumbent\ndata: {json.dumps(dict(info, solution=solution))}\n\n"
+                sent = len(incumbents)
+                if status["status"] != last_status:
+                    last_status = status["status"]
+                    yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                if last_status in FINISHED_STATUSES:
+                    return
+                time.sleep(0.5)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/api/jobs/<job_id>/accept", methods=["POST"])
+def accept_job(job_id):
+    if not get_job_manager().accept(job_id):
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(get_job_manager().status(job_id))
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    if not get_job_manager().cancel(job_id):
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(get_job_manager().status(job_id))
+
+@app.route("/api/timetables/<int:timetable_id>/entries", methods=["GET"])
+def timetable_entries(timetable_id):
+    """Stored assignments of one variant, filtered by batch_id, faculty_id, room_id or timeslot."""
+    args = request.args
+    timeslot = args.get("timeslot", type=int)
+    entries = store.timetable_entries(timetable_id, variant=args.get("variant", 0, type=int),
+                                      batch_id=args.get("batch_id"), faculty_id=args.get("faculty_id"),
+                                      room_id=args.get("room_id"), timeslot=timeslot)
+    return jsonify({"timetable_id": timetable_id, "entries": entries})
+
+def get_views(timetable_id, variant):
+    """TimetableViews of a stored variant, built on first use; None if it doesn't exist."""
+    def build():
+        info = store.timetable_info(timetable_id)
+        if info is None or not 0 <= variant < info["num_variants"]:
+            return None
+        # the rooms of the instance it was generated from; timetables stored before
+        # room_ids was recorded fall back to the current rooms
+        room_ids = info["room_ids"] if info["room_ids"] is not None else store.room_ids()
+        return TimetableViews(store.timetable_entries(timetable_id, variant=variant), room_ids,
+                              info["days"] * info["periods_per_day"])
+    return view_cache.get_or_build((timetable_id, variant), build)
+
+
+def pagination():
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(500, max(1, request.args.get("per_page", 50, type=int)))
+    return page, per_page
+
+
+def conditional_response(views, cache_key, build):
+    # Stored timetables (entries and rooms) never change, so the ETag only depends on the page asked for
+    etag = views.etag(*cache_key)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(views.render(cache_key, build), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route("/api/timetables/<int:timetable_id>/views/<kind>", methods=["GET"])
+def timetable_view(timetable_id, kind):
+    """Entities of one kind (batch, faculty, room or day), paginated, each with its entries."""
+    if kind not in VIEW_KINDS:
+        return jsonify({"error": f"Unknown view {kind!r}"}), 404
+    views = get_views(timetable_id, request.args.get("variant", 0, type=int))
+    if views is None:
+        return jsonify({"error": "Unknown timetable or variant"}), 404
+    page, per_page = pagination()
+    return conditional_response(views, (kind, page, per_page), lambda: views.entity_page(kind, page, per_page))
+
+@app.route("/api/timetables/<int:timetable_id>/views/<kind>/<key>", methods=["GET"])
+def timetable_view_entity(timetable_id, kind, key):
+    """Entries of one batch, faculty, room or day, paginated."""
+    if kind not in VIEW_KINDS:
+        return jsonify({"error": f"Unknown view {kind!r}"}), 404
+    views = get_views(timetable_id, request.args.get("variant", 0, type=int))
+    if views is None:
+        return jsonify({"error": "Unknown timetable or variant"}), 404
+    if not views.has_key(kind, key):
+        return jsonify({"error": f"No entries for {kind} {key!r}"}), 404
+    page, per_page = pagination()
+    return conditional_response(views, (kind, key, page, per_page), lambda: views.entry_page(kind, key, page, per_page))
+
+@app.route("/api/timetables/<int:timetable_id>/free-rooms", methods=["GET"])
+def timetable_free_rooms(timetable_id):
+    views = get_views(timetable_id, request.args.get("variant", 0, type=int))
+    if views is None:
+        return jsonify({"error": "Unknown timetable or variant"}), 404
+    timeslot = request.args.get("timeslot", type=int)
+    if timeslot is None or not 0 <= timeslot < len(views.free_rooms):
+        return jsonify({"error": "timeslot is required and must be within the timetable"}), 400
+    return conditional_response(views, ("free-rooms", timeslot), lambda: views.free_rooms_at(timeslot))
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(result_cache.stats())
 
-    solutions, session_map = generate_timetable(data_store, days, periods_per_day, num_variants)
-    return jsonify({"solutions": solutions, "sessions": session_map})
+@app.route("/api/cache", methods=["DELETE"])
+def clear_cache():
+    result_cache.clear()
+    return jsonify(result_cache.stats())
 
 if __name__ == "__main__":
     app.run(debug=True)
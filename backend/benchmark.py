@@ -0,0 +1,197 @@
+"""
+Benchmark suite for the CP-SAT timetable engine.
+
+Usage:
+    python benchmark.py                              # run all cases, print a table
+    python benchmark.py --cases small medium --output results.json
+    python benchmark.py --compare old.json new.json  # per-phase ratios between two runs
+
+Each (case, formulation) runs in a fresh process on an instance from
+instance_generator.generate_instance and measures every phase of
+generate_timetable separately: session expansion, eligibility precompute,
+variable creation, constraint building (incl. objective), solve and extraction.
+It records variable and constraint counts, peak RSS, solver status and objective.
+Results are written as JSON together with the git commit so runs from different
+commits can be compared.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import time
+
+CASES = {
+    "tiny": dict(num_batches=2, num_subjects=4, num_rooms=4, num_faculties=6),
+    "small": dict(num_batches=4, num_subjects=6, num_rooms=8, num_faculties=10),
+    "medium": dict(num_batches=8, num_subjects=8, num_rooms=12, num_faculties=20, fixed_slot_ratio=0.1),
+    "large": dict(num_batches=16, num_subjects=7, num_rooms=20, num_faculties=40, availability=0.7, fixed_slot_ratio=0.1),
+    # per-batch curriculum: many subjects overall, few per batch
+    "campus": dict(num_batches=24, num_subjects=30, subjects_per_batch=5, num_rooms=24, num_faculties=48,
+                   fixed_slot_ratio=0.1),
+}
+FORMULATIONS = ("assignment", "decomposed")
+PHASES = ("expansion", "eligibility", "variables", "constraints", "objective", "solve", "extraction")
+
+
+def run_case(case, formulation, time_limit, workers, seed):
+    """Run one benchmark in the current process and return its result dict."""
+    from ortools.sat.python import cp_model
+
+    from instance_generator import generate_instance
+    from optimization_engine import (TimeTableUtils, build_decomposed_model, build_timetable_model,
+                                     expand_sessions, load_instance)
+
+    params = CASES[case]
+    max_classes_per_day = 6
+    data = generate_instance(seed=seed, max_classes_per_day=max_classes_per_day, **params)
+    utils = TimeTableUtils(days=5, periods_per_day=6)
+    timings = {}
+
+    start = time.perf_counter()
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    sessions = expand_sessions(batches, subjects)
+    timings["expansion"] = time.perf_counter() - start
+
+    build = build_decomposed_model if formulation == "decomposed" else build_timetable_model
+    result = {"case": case, "formulation": formulation, "params": params, "seed": seed, "sessions": len(sessions),
+              "fixed_slots": len(fixed_slots)}
+    requested = round(len(sessions) * params.get("fixed_slot_ratio", 0.0))
+    if len(fixed_slots) < requested:
+        result["warning"] = f"only {len(fixed_slots)} of {requested} requested fixed slots could be drawn"
+    try:
+        model, assign = build(sessions, rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                              max_classes_per_day=max_classes_per_day, timings=timings)
+    except ValueError as e:
+        result.update(status="BUILD_ERROR", error=str(e), timings=timings)
+        return result
+    # the builders time every constraint family separately
+    timings["constraints"] = sum(v for k, v in timings.items() if k.startswith("constraints:"))
+    proto = model.Proto()
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = workers
+    start = time.perf_counter()
+    status = solver.Solve(model)
+    timings["solve"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if formulation == "decomposed":
+            solution = [(sid, solver.Value(t), solver.Value(r), solver.Value(f)) for sid, (t, r, f) in assign.items()]
+        else:
+            solution = [key for key, v in assign.items() if solver.Value(v)]
+        objective = solver.ObjectiveValue()
+    else:
+        solution, objective = [], None
+    timings["extraction"] = time.perf_counter() - start
+
+    result.update(
+        variables=len(proto.variables),
+        constraints=len(proto.constraints),
+        status=solver.StatusName(status),
+        objective=objective,
+        best_bound=solver.BestObjectiveBound() if objective is not None else None,
+        assigned=len(solution),
+        timings=timings,
+        # ru_maxrss is reported in KiB on Linux
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+    return result
+
+
+def _child(queue, *args):
+    queue.put(run_case(*args))
+
+
+def run_isolated(*args):
+    """run_case in a fresh process so the peak RSS belongs to that case alone."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(queue,) + args)
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    header = f"{'case':>7} {'formulation':>11} {'sessions':>8} {'vars':>8} {'cons':>8} " + \
+             " ".join(f"{p[:8]:>8}" for p in PHASES) + f" {'peak_mb':>8} {'status':>10} {'objective':>9}"
+    print(header)
+    for r in results:
+        timings = r.get("timings", {})
+        print(f"{r['case']:>7} {r['formulation']:>11} {r['sessions']:>8} {r.get('variables', '-'):>8} {r.get('constraints', '-'):>8} "
+              + " ".join(f"{timings.get(p, 0.0):>8.3f}" for p in PHASES)
+              + f" {r.get('peak_rss_mb', 0.0):>8.1f} {r['status']:>10} {str(r.get('objective')):>9}")
+    for r in results:
+        if r.get("warning"):
+            print(f"warning: {r['case']} {r['formulation']}: {r['warning']}")
+
+
+def compare(old_path, new_path):
+    """Print new/old ratios per phase for every (case, formulation) present in both files."""
+    with open(old_path) as f:
+        old = {(r["case"], r["formulation"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {(r["case"], r["formulation"]): r for r in json.load(f)["results"]}
+    print(f"{'case':>7} {'formulation':>11} " + " ".join(f"{p[:8]:>8}" for p in PHASES) + f" {'vars':>8} {'peak_mb':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+
+        def ratio(a, b):
+            return f"{b / a:>8.2f}" if a else f"{'-':>8}"
+
+        print(f"{key[0]:>7} {key[1]:>11} "
+              + " ".join(ratio(o["timings"].get(p, 0.0), n["timings"].get(p, 0.0)) for p in PHASES)
+              + f" {ratio(o.get('variables', 0), n.get('variables', 0))} {ratio(o.get('peak_rss_mb', 0), n.get('peak_rss_mb', 0))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--formulations", nargs="+", choices=FORMULATIONS, default=list(FORMULATIONS))
+    parser.add_argument("--time-limit", type=float, default=10.0, help="CP-SAT time limit per solve (s)")
+    parser.add_argument("--workers", type=int, default=8, help="CP-SAT search workers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for case in args.cases:
+        for formulation in args.formulations:
+            results.append(run_isolated(case, formulation, args.time_limit, args.workers, args.seed))
+    print_table(results)
+
+    if args.output:
+        from ortools import __version__ as ortools_version
+
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "ortools": ortools_version,
+                "time_limit": args.time_limit,
+                "workers": args.workers,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
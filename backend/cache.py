@@ -0,0 +1,145 @@
+"""
+Result cache for generated timetables.
+
+Entries are keyed by `instance_fingerprint`, a canonical hash of the normalized
+instance plus the generation parameters, so reloading identical data and asking
+for the same generation is answered without another CP-SAT run.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from optimization_engine import load_instance
+
+
+def instance_fingerprint(data, params):
+    """
+    Canonical sha256 of the instance and generation params.
+
+    Only fields the engine reads are hashed; set-like lists (availability, allowed
+    rooms, eligible faculties, curriculum entries) are sorted and rooms/faculties/fixed
+    slots are sorted by id. Batch and subject order is kept since it determines session ids.
+    """
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    canonical = {
+        "rooms": sorted([r.id, r.capacity] for r in rooms),
+        "faculties": sorted([f.id, sorted(f.available_times)] for f in faculties),
+        "batches": [[b.id, b.size] if b.curriculum is None else
+                    [b.id, b.size, sorted(([e.subject_id, e.hours_per_week, e.sections, e.elective_group,
+                                            sorted(e.combined_with), e.size] for e in b.curriculum), key=json.dumps)]
+                    for b in batches],
+        "subjects": [[s.id, s.hours_per_week, sorted(s.allowed_rooms), sorted(s.eligible_faculties)] for s in subjects],
+        "fixed_slots": sorted([fs.session_idx, fs.timeslot, fs.room or "", fs.faculty or ""] for fs in fixed_slots),
+        "params": params,
+    }
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of (solutions, session_map) with a bounded number of entries.
+
+    If `directory` is given every entry is also written there as JSON and the
+    cache is reloaded from it on startup (most recently used entries first).
+    """
+
+    def __init__(self, max_entries=128, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self.directory:
+                # Touch so the LRU order survives a restart; another process sharing the
+                # directory may have evicted the file already
+                try:
+                    os.utime(self._path(key))
+                except FileNotFoundError:
+                    pass
+            return entry
+
+    def put(self, key, solutions, session_map):
+        with self._lock:
+            self._entries[key] = (solutions, session_map)
+            self._entries.move_to_end(key)
+            if self.directory:
+                self._write(key, {"solutions": solutions, "sessions": session_map})
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._remove(old_key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.directory),
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _write(self, key, entry):
+        # Write to a temporary file and rename it, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _remove(self, key):
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _load(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    files.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+                except FileNotFoundError:
+                    continue
+        files.sort()
+        for _, name in files[-self.max_entries:]:
+            try:
+                with open(os.path.join(self.directory, name), "r") as f:
+                    entry = json.load(f)
+                # JSON turns tuples into lists and int session ids into strings
+                solutions = [[tuple(a) for a in sol] for sol in entry["solutions"]]
+                session_map = {int(sid): sess for sid, sess in entry["sessions"].items()}
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                continue  # vanished, truncated or corrupt: skip, it is only a cache
+            self._entries[name[:-len(".json")]] = (solutions, session_map)
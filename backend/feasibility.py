@@ -0,0 +1,312 @@
+"""
+Feasibility analysis before (and after) solving.
+
+analyze_instance compares demand with supply for every batch, faculty, room and
+subject and checks the fixed slots, without building a model. Each check is a
+necessary condition, so every issue it reports is a real infeasibility and names
+the entities to fix; it runs in milliseconds.
+
+diagnose_infeasibility handles what those counting arguments miss: it builds the
+CP-SAT model with one assumption literal per hard constraint group (a subject's
+hours for a batch, a room's or faculty's clash constraints, a daily cap, a fixed
+slot), takes the infeasible core CP-SAT reports and shrinks it until dropping any
+further group makes the model feasible.
+"""
+import time
+from collections import defaultdict
+
+from ortools.sat.python import cp_model
+
+from optimization_engine import TimeTableUtils, build_timetable_model, compute_eligibility, expand_sessions
+
+
+class InfeasibleInstanceError(ValueError):
+    """Raised by generate_timetable for data that can't be scheduled; `report` says why."""
+
+    def __init__(self, report):
+        self.report = report
+        reasons = report.get("issues") or report.get("diagnosis", {}).get("conflict") or []
+        super().__init__("Infeasible instance: " + "; ".join(r["message"] for r in reasons[:5]))
+
+    def __reduce__(self):
+        # keep the report when the error crosses a process boundary (job workers)
+        return type(self), (self.report,)
+
+
+def _issue(entity, entity_id, constraint, message, demand=None, supply=None):
+    return {"entity": entity, "id": entity_id, "constraint": constraint, "demand": demand, "supply": supply,
+            "message": message}
+
+
+def analyze_instance(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4):
+    """
+    Same inputs as solve_timetables. Returns a report dict:
+        ok: True if no issue was found (the instance may still be infeasible, see
+            diagnose_infeasibility)
+        issues: list of {entity, id, constraint, demand, supply, message}
+        batches / faculties / rooms: {id, demand, supply, slack} per entity, tightest first
+        elapsed: seconds spent
+    Demand counts the class hours an entity must take; supply the slots it can take them
+    in (timeslots, faculty availability and max_classes_per_day per day).
+    """
+    start = time.perf_counter()
+    if fixed_slots is None:
+        fixed_slots = []
+    sessions = expand_sessions(batches, subjects)
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    fac_available = [set(f.available_times) & set(range(utils.T)) for f in faculties]
+    issues = []
+
+    def daily_capped(timeslots):
+        per_day = defaultdict(int)
+        for t in timeslots:
+            per_day[utils.timeslot_to_day_period(t)[0]] += 1
+        return sum(min(n, max_classes_per_day) for n in per_day.values())
+
+    fac_supply = [daily_capped(available) for available in fac_available]
+
+    # Candidate faculties per session: the eligible ones (any faculty if none listed) that are ever available
+    candidates = {}
+    for sess in sessions:
+        fac_idxs = eligible_faculty_idxs[sess['id']] or list(range(len(faculties)))
+        candidates[sess['id']] = [f_idx for f_idx in fac_idxs if fac_available[f_idx]]
+
+    # Per (batch, subject): a room and a teacher must exist at all
+    seen = set()
+    for sess in sessions:
+        pair = (sess['batch_id'], sess['subject_id'])
+        if pair in seen:
+            continue
+        seen.add(pair)
+        if not eligible_room_idxs[sess['id']]:
+            issues.append(_issue("subject", sess['subject_id'], "room_capacity",
+                                 f"No room holds batch {sess['batch_id']} ({sess['size']} students) "
+                                 f"for subject {sess['subject_id']}", demand=sess['size']))
+        if not candidates[sess['id']]:
+            issues.append(_issue("subject", sess['subject_id'], "no_faculty",
+                                 f"No eligible faculty with available timeslots teaches subject {sess['subject_id']}"))
+
+    # Batches: total hours against the timeslots in which some teacher of theirs is available.
+    # Sections and electives of one block run in parallel, so a block needs its busiest member's hours
+    batch_report = []
+    sessions_by_batch = defaultdict(list)
+    for sess in sessions:
+        for batch_id in sess['batch_ids']:
+            sessions_by_batch[batch_id].append(sess)
+    for batch in batches:
+        batch_sessions = sessions_by_batch[batch.id]
+        teachable = set()
+        member_hours = defaultdict(int)
+        for sess in batch_sessions:
+            for f_idx in candidates[sess['id']]:
+                teachable |= fac_available[f_idx]
+            member_hours[(sess['block'], sess['member'] if sess['block'] is not None else sess['id'])] += 1
+        block_hours = defaultdict(int)
+        for (block, _), hours in member_hours.items():
+            if block is None:
+                block_hours[None] += hours
+            else:
+                block_hours[block] = max(block_hours[block], hours)
+        demand, supply = sum(block_hours.values()), daily_capped(teachable)
+        batch_report.append({"id": batch.id, "demand": demand, "supply": supply, "slack": supply - demand})
+        if demand > supply:
+            issues.append(_issue("batch", batch.id, "batch_hours",
+                                 f"Batch {batch.id} needs {demand} classes but can attend at most {supply} "
+                                 f"(timeslots with a teacher available, {max_classes_per_day} per day)",
+                                 demand=demand, supply=supply))
+
+    # Faculties: classes only they can teach against their available slots
+    forced = defaultdict(int)
+    for sess in sessions:
+        if len(candidates[sess['id']]) == 1:
+            forced[candidates[sess['id']][0]] += 1
+    faculty_report = []
+    for f_idx, fac in enumerate(faculties):
+        demand, supply = forced[f_idx], fac_supply[f_idx]
+        faculty_report.append({"id": fac.id, "demand": demand, "supply": supply, "slack": supply - demand})
+        if demand > supply:
+            issues.append(_issue("faculty", fac.id, "faculty_hours",
+                                 f"Faculty {fac.id} is the only teacher for {demand} classes but can teach at most "
+                                 f"{supply} ({len(fac_available[f_idx])} available timeslots, "
+                                 f"{max_classes_per_day} per day)", demand=demand, supply=supply))
+
+    # Subjects: all their classes against the combined slots of their teachers
+    subject_demand = defaultdict(int)
+    subject_teachers = defaultdict(set)
+    subject_rooms = defaultdict(set)
+    for sess in sessions:
+        subject_demand[sess['subject_id']] += 1
+        subject_teachers[sess['subject_id']].update(candidates[sess['id']])
+        subject_rooms[sess['subject_id']].update(eligible_room_idxs[sess['id']])
+    for subj_id, demand in subject_demand.items():
+        supply = sum(fac_supply[f_idx] for f_idx in subject_teachers[subj_id])
+        if subject_teachers[subj_id] and demand > supply:
+            issues.append(_issue("subject", subj_id, "subject_faculty_hours",
+                                 f"Subject {subj_id} needs {demand} classes but its teachers can give at most {supply}",
+                                 demand=demand, supply=supply))
+        supply = len(subject_rooms[subj_id]) * utils.T
+        if subject_rooms[subj_id] and demand > supply:
+            issues.append(_issue("subject", subj_id, "subject_room_hours",
+                                 f"Subject {subj_id} needs {demand} classes but its rooms have {supply} slots",
+                                 demand=demand, supply=supply))
+
+    # Rooms: classes that fit only one room against its timeslots
+    forced = defaultdict(int)
+    for sess in sessions:
+        if len(eligible_room_idxs[sess['id']]) == 1:
+            forced[eligible_room_idxs[sess['id']][0]] += 1
+    room_report = []
+    for r_idx, room in enumerate(rooms):
+        demand = forced[r_idx]
+        room_report.append({"id": room.id, "demand": demand, "supply": utils.T, "slack": utils.T - demand})
+        if demand > utils.T:
+            issues.append(_issue("room", room.id, "room_hours",
+                                 f"Room {room.id} is the only possible room for {demand} classes but has "
+                                 f"{utils.T} timeslots", demand=demand, supply=utils.T))
+
+    # Fixed slots: each must be placeable, and no two may collide
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    taken = {}
+    batch_taken = defaultdict(list)
+    fixed_per_day = defaultdict(set)
+    pinned = {}  # session id -> index of its first fixed slot
+    for i, fs in enumerate(fixed_slots):
+        sid = fs.session_idx
+        if not 0 <= sid < len(sessions) or not 0 <= fs.timeslot < utils.T:
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slot {i} refers to session {sid} / timeslot {fs.timeslot}, which don't exist"))
+            continue
+        # The same session pinned again (e.g. fixed slots imported twice) only clashes with
+        # itself if the pins disagree
+        first = fixed_slots[pinned.setdefault(sid, i)]
+        if first is not fs and (first.timeslot != fs.timeslot
+                                or None not in (first.room, fs.room) and first.room != fs.room
+                                or None not in (first.faculty, fs.faculty) and first.faculty != fs.faculty):
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slots {pinned[sid]} and {i} pin session {sid} to different slots"))
+        sess = sessions[sid]
+        r_idx = room_id_to_idx.get(fs.room) if fs.room is not None else None
+        f_idx = faculty_id_to_idx.get(fs.faculty) if fs.faculty is not None else None
+        if fs.room is not None and r_idx not in eligible_room_idxs[sid]:
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slot {i} puts session {sid} in room {fs.room}, which is unknown, too small "
+                                 f"or not allowed for subject {sess['subject_id']}"))
+        if fs.faculty is not None and (f_idx not in candidates[sid] or fs.timeslot not in fac_available[f_idx]):
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slot {i} gives session {sid} to faculty {fs.faculty}, who is unknown, "
+                                 f"not eligible or not available at timeslot {fs.timeslot}"))
+        if fs.faculty is None and not any(fs.timeslot in fac_available[f] for f in candidates[sid]):
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slot {i}: no teacher of session {sid} is available at timeslot {fs.timeslot}"))
+        clashes = []
+        for resource in (("room", fs.room), ("faculty", fs.faculty)):
+            if resource[1] is None:
+                continue
+            other = taken.setdefault((fs.timeslot,) + resource, i)
+            if other != i and fixed_slots[other].session_idx != sid:
+                clashes.append((other, resource))
+        day, _ = utils.timeslot_to_day_period(fs.timeslot)
+        for batch_id in sess['batch_ids']:
+            # members of one section/elective block may share the batch's timeslot
+            for other, other_sess in batch_taken[(fs.timeslot, batch_id)]:
+                if other_sess['id'] == sid:
+                    continue
+                if sess['block'] is None or other_sess['block'] != sess['block'] or \
+                        other_sess['member'] == sess['member']:
+                    clashes.append((other, ("batch", batch_id)))
+                    break
+            batch_taken[(fs.timeslot, batch_id)].append((i, sess))
+            fixed_per_day[(batch_id, day)].add(fs.timeslot)
+        for other, resource in clashes:
+            issues.append(_issue("fixed_slot", i, "fixed_slot",
+                                 f"Fixed slots {other} and {i} both use {resource[0]} {resource[1]} "
+                                 f"at timeslot {fs.timeslot}"))
+    for (batch_id, day), timeslots in fixed_per_day.items():
+        count = len(timeslots)
+        if count > max_classes_per_day:
+            issues.append(_issue("batch", batch_id, "batch_daily_cap",
+                                 f"Fixed slots give batch {batch_id} {count} classes on day {day}, "
+                                 f"more than max_classes_per_day={max_classes_per_day}",
+                                 demand=count, supply=max_classes_per_day))
+
+    def tightest(report):
+        return sorted(report, key=lambda e: (e["slack"], e["id"]))
+
+    return {
+        "ok": not issues,
+        "issues": issues,
+        "batches": tightest(batch_report),
+        "faculties": tightest(faculty_report),
+        "rooms": tightest(room_report),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+GROUP_DESCRIPTIONS = {
+    "demand": "all classes of subject {key[1]} for batch {key[0]}",
+    "room": "room {key} hosts one class at a time",
+    "faculty": "faculty {key} teaches one class at a time",
+    "batch": "batch {key} attends one class at a time",
+    "faculty_daily_cap": "faculty {key} teaches at most max_classes_per_day classes a day",
+    "batch_daily_cap": "batch {key} has at most max_classes_per_day classes a day",
+    "fixed_slot": "fixed slot {key}",
+}
+
+
+def diagnose_infeasibility(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None,
+                           max_classes_per_day=4, time_limit=20.0):
+    """
+    Find a small set of hard constraint groups that cannot hold together.
+
+    Returns {"status", "conflict", "minimal", "elapsed"}: status is the CP-SAT status of the
+    full model (INFEASIBLE, FEASIBLE or UNKNOWN); for INFEASIBLE, conflict lists
+    {family, key, message} groups and minimal says whether every group was confirmed
+    necessary within `time_limit` seconds (otherwise conflict is a valid but possibly
+    larger core).
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    sessions = expand_sessions(batches, subjects)
+    literals = {}
+    model, _ = build_timetable_model(sessions, rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                     max_classes_per_day=max_classes_per_day, assumptions=literals)
+    model.ClearObjective()  # any solution answers the question
+    by_index = {lit.Index(): group for group, lit in literals.items()}
+
+    def check(groups):
+        """CP-SAT status with only `groups` enforced, and the infeasible core among them."""
+        model.ClearAssumptions()
+        model.AddAssumptions([literals[group] for group in groups])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(0.1, deadline - time.perf_counter())
+        # assumption cores are only reported by the single-threaded search
+        solver.parameters.num_search_workers = 1
+        status = solver.Solve(model)
+        if status != cp_model.INFEASIBLE:
+            return status, None
+        core = {by_index[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in by_index}
+        return status, [group for group in groups if group in core]
+
+    status, core = check(list(literals))
+    result = {"status": cp_model.CpSolver().StatusName(status), "conflict": [], "minimal": False}
+    if status == cp_model.INFEASIBLE:
+        # Deletion filter: drop a group whenever the rest is still infeasible
+        minimal = True
+        i = 0
+        while i < len(core):
+            if time.perf_counter() >= deadline:
+                minimal = False
+                break
+            trial = core[:i] + core[i + 1:]
+            trial_status, trial_core = check(trial)
+            if trial_status == cp_model.INFEASIBLE:
+                core = trial_core or trial
+            else:
+                minimal = minimal and trial_status in (cp_model.FEASIBLE, cp_model.OPTIMAL)
+                i += 1
+        result["conflict"] = [{"family": family, "key": list(key) if isinstance(key, tuple) else key,
+                               "message": GROUP_DESCRIPTIONS[family].format(key=key)} for family, key in core]
+        result["minimal"] = minimal
+    result["elapsed"] = time.perf_counter() - start
+    return result
@@ -0,0 +1,12 @@
+import os
+
+# Generation jobs (jobs.JobManager) live in the memory of one process, and so does its
+# bounded solver pool: run a single worker and serve concurrent requests, including the
+# long-lived job event streams, from its threads. A second worker would refuse job
+# requests (see JOB_LOCK_FILE in config.py). Scale the solving with TIMETABLE_JOB_WORKERS.
+#
+#     gunicorn app:app
+bind = os.environ.get("TIMETABLE_BIND", "0.0.0.0:8000")
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("TIMETABLE_HTTP_THREADS", 16))
@@ -0,0 +1,178 @@
+"""
+Constructive heuristic timetable engine.
+
+Places sessions most-constrained-first into the cheapest free (timeslot, room,
+faculty) and repairs dead ends with a small conflict-driven local search. It
+respects the same hard constraints as the CP-SAT model (room, faculty and batch
+clashes, capacity, availability, max_classes_per_day and fixed slots) and runs in
+milliseconds, so it serves quick previews and seeds CP-SAT with a hint.
+"""
+import random
+from collections import defaultdict
+
+from optimization_engine import TimeTableUtils, compute_eligibility, expand_sessions
+
+
+def solve_heuristic(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4,
+                    seed=0, max_repair_steps=None):
+    """
+    Same inputs as solve_timetables. Returns one solution as a list of
+    (session_id, timeslot, room_id, faculty_id), or None if the repair step budget
+    (default 50 * number of sessions) runs out before every session is placed.
+    """
+    if fixed_slots is None:
+        fixed_slots = []
+    rng = random.Random(seed)
+
+    sessions = expand_sessions(batches, subjects)
+    if max_repair_steps is None:
+        max_repair_steps = 50 * len(sessions)
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    fac_available = [set(f.available_times) for f in faculties]
+    late_period = utils.periods_per_day - 2
+
+    # Candidate (t, r_idx, f_idx) per session: the same tuples the CP-SAT model has variables for
+    candidates = {}
+    for s in sessions:
+        sid = s['id']
+        fac_idxs = eligible_faculty_idxs[sid] or list(range(len(faculties)))
+        candidates[sid] = [(t, r_idx, f_idx) for t in range(utils.T) for r_idx in eligible_room_idxs[sid]
+                           for f_idx in fac_idxs if t in fac_available[f_idx]]
+
+    # Fixed slots shrink the candidate list to the matching tuples and are never evicted
+    pinned = set()
+    for fs in fixed_slots:
+        sid = fs.session_idx
+        r_idx = room_id_to_idx.get(fs.room) if fs.room is not None else None
+        f_idx = faculty_id_to_idx.get(fs.faculty) if fs.faculty is not None else None
+        candidates[sid] = [(t, rr, ff) for t, rr, ff in candidates.get(sid, [])
+                           if t == fs.timeslot and (r_idx is None or rr == r_idx) and (f_idx is None or ff == f_idx)]
+        pinned.add(sid)
+    if any(not cands for cands in candidates.values()):
+        return None
+
+    # Occupancy: who holds each (t, room) / (t, faculty) / (t, batch), and per-day counts.
+    # A batch slot holds one whole-batch class or several sessions of one section/elective block
+    room_at = {}
+    fac_at = {}
+    batch_at = defaultdict(set)
+    fac_day = defaultdict(set)
+    batch_day = defaultdict(set)
+    fac_load = defaultdict(int)
+    placed = {}
+
+    def conflicts(sid, cand):
+        """Sessions that would have to leave for `sid` to take `cand`."""
+        t, r_idx, f_idx = cand
+        day, _ = utils.timeslot_to_day_period(t)
+        sess = sessions[sid]
+        clash = set()
+        for holder in (room_at.get((t, r_idx)), fac_at.get((t, f_idx))):
+            if holder is not None:
+                clash.add(holder)
+        for batch_id in sess['batch_ids']:
+            for holder in batch_at[(t, batch_id)]:
+                other = sessions[holder]
+                # only other members of the same block may share the batch's timeslot
+                if sess['block'] is None or other['block'] != sess['block'] or other['member'] == sess['member']:
+                    clash.add(holder)
+        day_set = fac_day[(day, f_idx)]
+        if len(day_set - clash) >= max_classes_per_day:
+            # evict one class of that day to make room
+            clash.add(min(day_set - clash, key=lambda other: other in pinned))
+        for batch_id in sess['batch_ids']:
+            # a batch's daily count is in timeslots: block members meeting together count once
+            by_slot = defaultdict(set)
+            for other in batch_day[(day, batch_id)] - clash:
+                by_slot[placed[other][0]].add(other)
+            if t not in by_slot and len(by_slot) >= max_classes_per_day:
+                # evict the classes of one timeslot of that day to make room
+                clash |= min(by_slot.values(), key=lambda others: bool(others & pinned))
+        return clash
+
+    def cost(sid, cand):
+        t, r_idx, f_idx = cand
+        _, period = utils.timeslot_to_day_period(t)
+        return (period >= late_period) * 10 + fac_load[f_idx] + rng.random()
+
+    def place(sid, cand):
+        t, r_idx, f_idx = cand
+        day, _ = utils.timeslot_to_day_period(t)
+        room_at[(t, r_idx)] = sid
+        fac_at[(t, f_idx)] = sid
+        fac_day[(day, f_idx)].add(sid)
+        for batch_id in sessions[sid]['batch_ids']:
+            batch_at[(t, batch_id)].add(sid)
+            batch_day[(day, batch_id)].add(sid)
+        fac_load[f_idx] += 1
+        placed[sid] = cand
+
+    def remove(sid):
+        t, r_idx, f_idx = placed.pop(sid)
+        day, _ = utils.timeslot_to_day_period(t)
+        del room_at[(t, r_idx)]
+        del fac_at[(t, f_idx)]
+        fac_day[(day, f_idx)].discard(sid)
+        for batch_id in sessions[sid]['batch_ids']:
+            batch_at[(t, batch_id)].discard(sid)
+            batch_day[(day, batch_id)].discard(sid)
+        fac_load[f_idx] -= 1
+
+    # Most constrained first: pinned sessions, then fewest candidates
+    order = sorted(candidates, key=lambda sid: (sid not in pinned, len(candidates[sid]), rng.random()))
+    queue = list(reversed(order))
+    steps = 0
+    while queue:
+        sid = queue.pop()
+        free = [cand for cand in candidates[sid] if not conflicts(sid, cand)]
+        if free:
+            place(sid, min(free, key=lambda cand: cost(sid, cand)))
+            continue
+
+        # Dead end: local search repair. Take the candidate that evicts the fewest
+        # (never pinned) sessions, with some noise to avoid cycling, and requeue them.
+        steps += 1
+        if steps > max_repair_steps:
+            return None
+        best, best_score = None, None
+        for cand in candidates[sid]:
+            clash = conflicts(sid, cand)
+            if clash & pinned:
+                continue
+            score = len(clash) + rng.random() * 0.5
+            if best_score is None or score < best_score:
+                best, best_score = cand, score
+        if best is None:
+            return None
+        for other in conflicts(sid, best):
+            remove(other)
+            queue.append(other)
+        place(sid, best)
+
+    return sorted((sid, t, rooms[r_idx].id, faculties[f_idx].id) for sid, (t, r_idx, f_idx) in placed.items())
+
+
+def solve_heuristic_variants(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4,
+                             num_variants=1, max_attempts=None):
+    """
+    Up to `num_variants` heuristic solutions with distinct (batch, subject, timeslot) patterns,
+    one seed per attempt (at most `max_attempts`, default 5 * num_variants).
+    """
+    sessions = expand_sessions(batches, subjects)
+    seen = set()
+    solutions = []
+    for seed in range(max_attempts or 5 * num_variants):
+        sol = solve_heuristic(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                              max_classes_per_day=max_classes_per_day, seed=seed)
+        if sol is None:
+            continue
+        pattern = frozenset((sessions[sid]['batch_id'], sessions[sid]['subject_id'], t) for sid, t, _, _ in sol)
+        if pattern in seen:
+            continue
+        seen.add(pattern)
+        solutions.append(sol)
+        if len(solutions) == num_variants:
+            break
+    return solutions
@@ -0,0 +1,84 @@
+"""
+Seeded synthetic timetable instances at realistic scale.
+
+`generate_instance` returns the same raw dict payload as sample_data.json, so the
+result can be fed to generate_timetable, load_instance or the web API as is.
+"""
+import random
+import warnings
+
+from optimization_engine import TimeTableUtils, expand_sessions, load_instance
+
+
+def generate_instance(num_batches=4, num_subjects=6, num_rooms=8, num_faculties=8, availability=0.8, fixed_slot_ratio=0.0,
+                      days=5, periods_per_day=6, max_classes_per_day=6, seed=0, subjects_per_batch=None):
+    """
+    num_*: entity counts
+    availability: fraction of timeslots each faculty is available in (0..1)
+    subjects_per_batch: if given, every batch takes that many randomly drawn subjects and
+        the instance gets a curriculum; by default every batch takes every subject
+    fixed_slot_ratio: fraction of sessions pinned by a fixed slot. Pins are taken from a
+        heuristic solution of the generated instance so they are mutually consistent; if
+        the heuristic finds none, no fixed slots are added and a warning is issued.
+    seed: everything is drawn from random.Random(seed), so equal arguments give equal instances
+    """
+    rng = random.Random(seed)
+    utils = TimeTableUtils(days=days, periods_per_day=periods_per_day)
+
+    rooms = []
+    for i in range(num_rooms):
+        is_lab = rng.random() < 0.25
+        rooms.append({"id": f"R{i}", "name": f"{'Lab' if is_lab else 'Room'} {i}",
+                      "capacity": rng.choice([30, 40, 60]) if is_lab else rng.choice([40, 60, 80, 120]),
+                      "type": "lab" if is_lab else "classroom"})
+    lab_ids = [r["id"] for r in rooms if r["type"] == "lab"] or [r["id"] for r in rooms]
+    classroom_ids = [r["id"] for r in rooms if r["type"] == "classroom"] or [r["id"] for r in rooms]
+
+    faculties = []
+    num_available = max(1, round(utils.T * availability))
+    for i in range(num_faculties):
+        faculties.append({"id": f"F{i}", "name": f"Faculty {i}", "subjects": [],
+                          "available_times": sorted(rng.sample(range(utils.T), num_available))})
+
+    batches = [{"id": f"B{i}", "name": f"Batch {i}", "size": rng.choice([30, 40, 60])} for i in range(num_batches)]
+
+    curriculum = []
+    takers = [num_batches] * num_subjects
+    if subjects_per_batch is not None:
+        takers = [0] * num_subjects
+        for b in batches:
+            for i in sorted(rng.sample(range(num_subjects), min(num_subjects, subjects_per_batch))):
+                curriculum.append({"batch_id": b["id"], "subject_id": f"S{i}"})
+                takers[i] += 1
+
+    subjects = []
+    for i in range(num_subjects):
+        is_lab = rng.random() < 0.2
+        pool = lab_ids if is_lab else classroom_ids
+        # subjects taken by more batches need more teachers and rooms
+        teachers = rng.sample(faculties, min(len(faculties), rng.randint(2, 3) + takers[i] // 4))
+        subjects.append({"id": f"S{i}", "name": f"{'Lab' if is_lab else 'Subject'} {i}",
+                         "hours_per_week": rng.randint(2, 4),
+                         "allowed_rooms": rng.sample(pool, min(len(pool), rng.randint(2, 4) + takers[i] // 4)),
+                         "eligible_faculties": [f["id"] for f in teachers]})
+        for f in teachers:
+            f["subjects"].append(f"S{i}")
+
+    data = {"rooms": rooms, "faculties": faculties, "batches": batches, "subjects": subjects, "fixed_slots": []}
+    if curriculum:
+        data["curriculum"] = curriculum
+
+    if fixed_slot_ratio > 0:
+        from heuristic_engine import solve_heuristic
+
+        r, f, b, s, _ = load_instance(data)
+        solution = solve_heuristic(r, f, b, s, utils, max_classes_per_day=max_classes_per_day, seed=seed)
+        num_fixed = round(len(expand_sessions(b, s)) * fixed_slot_ratio)
+        if solution is None:
+            warnings.warn(f"No heuristic solution to draw fixed slots from; the {num_fixed} requested "
+                          f"fixed slots (ratio {fixed_slot_ratio}) were not added")
+        else:
+            for sid, t, rid, fid in sorted(rng.sample(solution, min(num_fixed, len(solution)))):
+                data["fixed_slots"].append({"session_idx": sid, "timeslot": t, "room": rid, "faculty": fid})
+
+    return data
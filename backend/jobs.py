@@ -0,0 +1,249 @@
+"""
+Background timetable generation jobs.
+
+Each job runs `generate_timetable` in a bounded process pool so long CP-SAT
+searches never block a web worker. Progress, solver telemetry, the latest
+incumbent and cancellation are shared with the worker process through a
+multiprocessing Manager.
+
+The job registry lives in the memory of the process that created the
+JobManager, so the web app must run as a single process (one gunicorn worker
+serving requests from threads, see gunicorn.conf.py). Given a lock_path, the
+JobManager holds an exclusive lock on that file and a second process trying
+to create one gets JobManagerUnavailable instead of silently keeping its own
+registry.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+
+from optimization_engine import generate_timetable
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock, single-process deployment is up to the operator
+    fcntl = None
+
+FINISHED_STATUSES = ("done", "cancelled", "failed")
+# Seconds between two incumbent timetables extracted for watching clients; every
+# incumbent's info is still published.
+INCUMBENT_INTERVAL = 1.0
+
+
+class JobManagerUnavailable(RuntimeError):
+    """Another process already holds the job registry (a multi-process deployment)."""
+
+
+def _run_job(data, params, state, cancel_event):
+    """Worker-side entry point: runs one generation and keeps `state` up to date."""
+    if cancel_event.is_set():
+        state["status"] = "cancelled"
+        return [], {}
+    state["status"] = "running"
+
+    def progress(variants_done, num_variants):
+        state["variants_done"] = variants_done
+
+    last_extracted = [None]
+
+    def incumbent(variant, info, solution):
+        # Manager dict proxies only see assignments, so values are replaced, never mutated
+        incumbents = state["incumbents"] + [dict(info, variant=variant)]
+        state["incumbents"] = incumbents
+        # Extracting and shipping a timetable slows the search, so only do it while a
+        # client watches (see JobManager.watch), at most every INCUMBENT_INTERVAL seconds
+        now = time.monotonic()
+        if state["watchers"] and (last_extracted[0] is None or now - last_extracted[0] >= INCUMBENT_INTERVAL):
+            last_extracted[0] = now
+            state["latest_solution"] = (len(incumbents) - 1, solution())
+
+    metrics = {}
+    solutions, session_map = generate_timetable(data, progress_callback=progress, cancel_event=cancel_event,
+                                                metrics=metrics, on_incumbent=incumbent, **params)
+    state["metrics"] = metrics
+    if state["accepted"]:
+        state["status"] = "done"
+    else:
+        state["status"] = "cancelled" if cancel_event.is_set() else "done"
+    return solutions, session_map
+
+
+class JobManager:
+    """
+    Submit, poll, fetch and cancel generation jobs.
+
+    max_workers bounds how many solves run at once; further jobs wait in the
+    pool's queue. Only the most recent `retention` finished jobs are kept.
+    lock_path: optional file locked for the manager's lifetime; raises
+    JobManagerUnavailable if another process holds it.
+    """
+
+    def __init__(self, max_workers=2, retention=100, lock_path=None):
+        self._lock_file = None
+        if lock_path is not None and fcntl is not None:
+            self._lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                raise JobManagerUnavailable(
+                    f"Process {os.getpid()} can't serve generation jobs: another process holds {lock_path}. "
+                    f"Jobs are kept in memory, run the app as a single process (see gunicorn.conf.py)") from None
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._manager = multiprocessing.Manager()
+        self._jobs = OrderedDict()  # job_id -> {"future", "state", "cancel", "info"}
+        self._lock = threading.Lock()
+        self.retention = retention
+
+    def submit(self, data, info=None, **params):
+        """
+        Queue a generation of `data` with generate_timetable keyword params. Returns the job id.
+        info: optional dict the caller keeps about the job (see `info`); it is pruned with the job.
+        """
+        job_id = uuid.uuid4().hex
+        state = self._manager.dict(status="queued", variants_done=0, num_variants=params.get("num_variants", 1),
+                                   error=None, accepted=False, incumbents=[], latest_solution=None, metrics=None,
+                                   watchers=0)
+        cancel_event = self._manager.Event()
+        future = self._executor.submit(_run_job, data, params, state, cancel_event)
+        with self._lock:
+            self._jobs[job_id] = {"future": future, "state": state, "cancel": cancel_event, "info": info or {}}
+            self._prune()
+        return job_id
+
+    def submit_completed(self, solutions, session_map, num_variants=1, info=None):
+        """Register an already finished job (e.g. a cache hit) so clients can use the same polling flow."""
+        job_id = uuid.uuid4().hex
+        future = Future()
+        future.set_result((solutions, session_map))
+        state = {"status": "done", "variants_done": len(solutions), "num_variants": num_variants, "error": None,
+                 "accepted": False, "incumbents": [], "latest_solution": None, "metrics": None, "watchers": 0}
+        with self._lock:
+            self._jobs[job_id] = {"future": future, "state": state, "cancel": threading.Event(), "info": info or {}}
+            self._prune()
+        return job_id
+
+    def status(self, job_id):
+        """
+        Status dict (status, variants_done, num_variants, error) or None for unknown jobs.
+        status is one of queued, running, cancelling, accepting, done, cancelled, failed.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        state = dict(job["state"])
+        for key in ("incumbents", "latest_solution", "metrics", "watchers"):
+            state.pop(key, None)
+        future = job["future"]
+        if future.cancelled():
+            state["status"] = "cancelled"
+        elif future.done() and future.exception() is not None:
+            state["status"] = "failed"
+            state["error"] = str(future.exception())
+            # feasibility.InfeasibleInstanceError says which data to fix
+            state["report"] = getattr(future.exception(), "report", None)
+        elif not future.done() and job["cancel"].is_set():
+            state["status"] = "accepting" if state.get("accepted") else "cancelling"
+        state["job_id"] = job_id
+        return state
+
+    def result(self, job_id):
+        """
+        Returns (status, solutions, session_map). solutions/session_map are None while
+        the job is queued or running; a cancelled job returns the variants found so far.
+        """
+        status = self.status(job_id)
+        if status is None:
+            return None, None, None
+        future = self._jobs[job_id]["future"]
+        if status["status"] not in FINISHED_STATUSES or status["status"] == "failed":
+            return status, None, None
+        try:
+            solutions, session_map = future.result()
+        except CancelledError:
+            solutions, session_map = [], {}
+        return status, solutions, session_map
+
+    def progress(self, job_id):
+        """
+        Live view of a job for streaming: (status, incumbents, latest_solution), or None for
+        unknown jobs. incumbents lists one info dict (variant, wall_time, objective, best_bound,
+        gap, num_branches, num_conflicts) per improving solution, oldest first.
+        latest_solution is (incumbent index, solution) of the newest incumbent extracted
+        while a client was watching (see watch), or None.
+        """
+        status = self.status(job_id)
+        if status is None:
+            return None
+        state = self._jobs[job_id]["state"]
+        return status, list(state.get("incumbents", [])), state.get("latest_solution")
+
+    @contextmanager
+    def watch(self, job_id):
+        """
+        Mark a client as watching the job's incumbents for the duration of the block;
+        incumbent timetables are only extracted while someone watches.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            with self._lock:
+                job["state"]["watchers"] = job["state"].get("watchers", 0) + 1
+        try:
+            yield
+        finally:
+            if job is not None:
+                with self._lock:
+                    job["state"]["watchers"] = job["state"].get("watchers", 1) - 1
+
+    def info(self, job_id):
+        """The caller's info dict given at submit (mutable, never sent to the worker), or None for unknown jobs."""
+        job = self._jobs.get(job_id)
+        return job["info"] if job is not None else None
+
+    def metrics(self, job_id):
+        """Solver telemetry of a finished job (see solve_timetables), or None while it runs or for unknown jobs."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return job["state"].get("metrics")
+
+    def accept(self, job_id):
+        """
+        Stop a running job early and keep what it has: the current incumbent becomes the
+        last variant and the job finishes as done rather than cancelled. Returns False for
+        unknown jobs.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if not job["future"].done():
+            job["state"]["accepted"] = True
+            job["cancel"].set()
+        return True
+
+    def cancel(self, job_id):
+        """Stop a job: drops it from the queue, or stops the running CP-SAT search. Returns False for unknown jobs."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job["cancel"].set()
+        job["future"].cancel()
+        return True
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            job["cancel"].set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._manager.shutdown()
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["future"].done()]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
@@ -1,7 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql
 
 db = SQLAlchemy()
 
+# Postgres keeps native arrays; other backends (SQLite for tests and local runs) store JSON lists
+StringList = db.JSON().with_variant(postgresql.ARRAY(db.String), "postgresql")
+IntegerList = db.JSON().with_variant(postgresql.ARRAY(db.Integer), "postgresql")
+
 class Room(db.Model):
     __tablename__ = "rooms"
     id = db.Column(db.String, primary_key=True)
@@ -13,19 +18,76 @@ class Faculty(db.Model):
     __tablename__ = "faculties"
     id = db.Column(db.String, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    subjects = db.Column(db.ARRAY(db.String), nullable=False)
-    available_times = db.Column(db.ARRAY(db.Integer), nullable=False)
+    subjects = db.Column(StringList, nullable=False)
+    available_times = db.Column(IntegerList, nullable=False)
 
 class Batch(db.Model):
     __tablename__ = "batches"
     id = db.Column(db.String, primary_key=True)
     name = db.Column(db.String, nullable=False)
     size = db.Column(db.Integer, nullable=False)
+    # batch and subject order determines session ids, so it is stored explicitly
+    position = db.Column(db.Integer, nullable=False, default=0)
 
 class Subject(db.Model):
     __tablename__ = "subjects"
     id = db.Column(db.String, primary_key=True)
     name = db.Column(db.String, nullable=False)
     hours_per_week = db.Column(db.Integer, nullable=False)
-    allowed_rooms = db.Column(db.ARRAY(db.String), nullable=True)
-    eligible_faculties = db.Column(db.ARRAY(db.String), nullable=True)
+    allowed_rooms = db.Column(StringList, nullable=True)
+    eligible_faculties = db.Column(StringList, nullable=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+class Curriculum(db.Model):
+    """Subjects a batch takes; a batch without rows takes every subject while no batch has any."""
+    __tablename__ = "curriculum"
+    batch_id = db.Column(db.String, primary_key=True)
+    subject_id = db.Column(db.String, primary_key=True)
+    # NULL keeps the subject's hours_per_week / the batch size
+    hours_per_week = db.Column(db.Integer, nullable=True)
+    sections = db.Column(db.Integer, nullable=False, default=1)
+    elective_group = db.Column(db.String, nullable=True)
+    combined_with = db.Column(StringList, nullable=True)
+    size = db.Column(db.Integer, nullable=True)
+
+class FixedSlot(db.Model):
+    __tablename__ = "fixed_slots"
+    id = db.Column(db.Integer, primary_key=True)
+    session_idx = db.Column(db.Integer, nullable=False, unique=True)  # one pin per session
+    timeslot = db.Column(db.Integer, nullable=False)
+    room = db.Column(db.String, nullable=True)
+    faculty = db.Column(db.String, nullable=True)
+
+class Timetable(db.Model):
+    """One generation run; its variants' assignments live in timetable_entries."""
+    __tablename__ = "timetables"
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    days = db.Column(db.Integer, nullable=False)
+    periods_per_day = db.Column(db.Integer, nullable=False)
+    num_variants = db.Column(db.Integer, nullable=False)
+    # every room when the timetable was generated, for its free-room view
+    room_ids = db.Column(StringList, nullable=True)
+
+class TimetableEntry(db.Model):
+    """One scheduled session of one variant, denormalized so per-entity lookups hit an index."""
+    __tablename__ = "timetable_entries"
+    id = db.Column(db.Integer, primary_key=True)
+    timetable_id = db.Column(db.Integer, db.ForeignKey("timetables.id", ondelete="CASCADE"), nullable=False)
+    variant = db.Column(db.Integer, nullable=False)
+    session_id = db.Column(db.Integer, nullable=False)
+    batch_id = db.Column(db.String, nullable=False)
+    subject_id = db.Column(db.String, nullable=False)
+    timeslot = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    room_id = db.Column(db.String, nullable=False)
+    faculty_id = db.Column(db.String, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_entries_batch", "timetable_id", "variant", "batch_id", "timeslot"),
+        db.Index("ix_entries_faculty", "timetable_id", "variant", "faculty_id", "timeslot"),
+        db.Index("ix_entries_room", "timetable_id", "variant", "room_id", "timeslot"),
+        db.Index("ix_entries_timeslot", "timetable_id", "variant", "timeslot"),
+    )
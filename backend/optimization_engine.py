@@ -1,48 +1,4 @@
-import random
-
-from models import Batch, Faculty
-
-# def generate_timetable(data, days=5, periods_per_day=6, num_variants=1):
-#     rooms = data["rooms"]
-#     faculties = data["faculties"]
-#     batches = data["batches"]
-#     subjects = data["subjects"]
-#     fixed_slots = data["fixed_slots"]
-
-#     total_slots = days * periods_per_day
-#     sessions = []
-
-#     # Expand subjects into required sessions
-#     for subj in subjects:
-#         for b in batches:
-#             for _ in range(subj["hours_per_week"]):
-#                 sessions.append({
-#                     "batch_id": b["id"],
-#                     "subject_id": subj["id"],
-#                     "faculty_id": random.choice(subj["eligible_faculties"]),
-#                     "room_id": random.choice(subj["allowed_rooms"])
-#                 })
-
-#     # Map session_id -> session details for frontend
-#     session_map = {i: sessions[i] for i in range(len(sessions))}
-
-#     solutions = []
-#     for _ in range(num_variants):
-#         used_slots = set()
-#         timetable = []
-#         for sid, sess in session_map.items():
-#             timeslot = random.randint(0, total_slots - 1)
-#             while timeslot in used_slots:
-#                 timeslot = random.randint(0, total_slots - 1)
-#             used_slots.add(timeslot)
-#             timetable.append([sid, timeslot, sess["room_id"], sess["faculty_id"]])
-#         solutions.append(timetable)
-
-#     return solutions, session_map
-
-
-def generate_timetable(data, days=5, periods_per_day=6, num_variants=1):
-    """
+"""
 Smart Timetable Optimization Engine (prototype)
 
 Usage:
@@ -58,316 +14,1319 @@ Notes / limitations:
 - You should adapt data ingestion and output formatting to your web/backend.
 
 """
-    from ortools.sat.python import cp_model
-    from collections import defaultdict, namedtuple
-    import random
-    import itertools
-    import math
-
-    # ------------------------ Data models ------------------------
-
-    # Times: represent as integers 0..T-1. Provide helper to map to day/period.
-    class TimeTableUtils:
-        def __init__(self, days=5, periods_per_day=8):
-            self.days = days
-            self.periods_per_day = periods_per_day
-            self.T = days * periods_per_day
-
-        def timeslot_to_day_period(self, t):
-            day = t // self.periods_per_day
-            period = t % self.periods_per_day
-            return day, period
-
-        def day_period_to_timeslot(self, day, period):
-            return day * self.periods_per_day + period
-
-    # ------------------------ Helper functions ------------------------
-
-    def expand_sessions(batches, subjects):
-        """
-        For each (batch, subject) combination, create `hours_per_week` session entries.
-        Each session represents one class instance that must be scheduled into a timeslot.
-        Returns list of sessions where each is a dict with keys: id, batch_id, subject_id, size, allowed_rooms, eligible_faculties
-        """
-        sessions = []
-        sid = 0
-        for batch in batches:
-            for subj in subjects:
-                # assume every subject applies to all batches for which it is intended. In real system, subjects will be assigned per batch.
-                # For prototype, schedule subject for every batch.
-                for _ in range(subj.hours_per_week):
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+
+from telemetry import SolveTelemetry
+
+# ------------------------ Data models ------------------------
+
+# Lightweight records the engine works on. The web layer hands us plain dicts
+# (see sample_data.json); `load_instance` converts them.
+Room = namedtuple('Room', ['id', 'name', 'capacity', 'type'])
+Faculty = namedtuple('Faculty', ['id', 'name', 'subjects', 'available_times'])
+# curriculum: the batch's CurriculumEntry tuple, or None for the legacy "every subject" default
+Batch = namedtuple('Batch', ['id', 'name', 'size', 'curriculum'], defaults=(None,))
+# One subject of a batch's curriculum. hours_per_week / size override the subject's hours and
+# the batch size (None keeps them); sections > 1 splits the batch into that many parallel
+# sections; subjects sharing an elective_group run in parallel, each for the students who
+# picked it; combined_with lists batches that attend the same classes together.
+CurriculumEntry = namedtuple('CurriculumEntry', ['subject_id', 'hours_per_week', 'sections', 'elective_group',
+                                                 'combined_with', 'size'], defaults=(None, 1, None, (), None))
+Subject = namedtuple('Subject', ['id', 'name', 'hours_per_week', 'allowed_rooms', 'eligible_faculties'])
+FixedSlot = namedtuple('FixedSlot', ['session_idx', 'timeslot', 'room', 'faculty'])
+
+
+# Times: represent as integers 0..T-1. Provide helper to map to day/period.
+class TimeTableUtils:
+    def __init__(self, days=5, periods_per_day=8):
+        self.days = days
+        self.periods_per_day = periods_per_day
+        self.T = days * periods_per_day
+
+    def timeslot_to_day_period(self, t):
+        day = t // self.periods_per_day
+        period = t % self.periods_per_day
+        return day, period
+
+    def day_period_to_timeslot(self, day, period):
+        return day * self.periods_per_day + period
+
+
+def load_instance(data):
+    """
+    Convert the raw dict payload (rooms, faculties, batches, subjects, fixed_slots and
+    optionally curriculum) into engine records. Returns (rooms, faculties, batches,
+    subjects, fixed_slots).
+
+    curriculum rows are {batch_id, subject_id} plus the optional CurriculumEntry fields.
+    Without curriculum rows every batch takes every subject; with them each batch takes
+    only its listed subjects (none if it has no rows).
+    """
+    rooms = [Room(r['id'], r.get('name', r['id']), r['capacity'], r.get('type')) for r in data.get('rooms', [])]
+    faculties = [Faculty(f['id'], f.get('name', f['id']), f.get('subjects', []), f.get('available_times', []))
+                 for f in data.get('faculties', [])]
+    curriculum = None
+    if data.get('curriculum'):
+        curriculum = defaultdict(list)
+        for c in data['curriculum']:
+            entry = CurriculumEntry(c['subject_id'], c.get('hours_per_week'), c.get('sections') or 1,
+                                    c.get('elective_group'), tuple(c.get('combined_with') or ()), c.get('size'))
+            if entry.combined_with and (entry.sections > 1 or entry.elective_group is not None):
+                raise ValueError(f"Curriculum entry {c['batch_id']}/{c['subject_id']}: combined classes can't "
+                                 f"also be split into sections or electives")
+            if entry.sections > 1 and entry.elective_group is not None:
+                raise ValueError(f"Curriculum entry {c['batch_id']}/{c['subject_id']}: an elective can't be split "
+                                 f"into sections")
+            curriculum[c['batch_id']].append(entry)
+    batches = [Batch(b['id'], b.get('name', b['id']), b['size'],
+                     tuple(curriculum.get(b['id'], ())) if curriculum is not None else None)
+               for b in data.get('batches', [])]
+    subjects = [Subject(s['id'], s.get('name', s['id']), s['hours_per_week'],
+                        s.get('allowed_rooms') or [], s.get('eligible_faculties') or [])
+                for s in data.get('subjects', [])]
+    fixed_slots = [FixedSlot(fs['session_idx'], fs['timeslot'], fs.get('room'), fs.get('faculty'))
+                   for fs in data.get('fixed_slots', [])]
+    return rooms, faculties, batches, subjects, fixed_slots
+
+
+# ------------------------ Helper functions ------------------------
+
+class PhaseTimer:
+    """Accumulates wall time per named phase into `timings` (a dict; None disables timing)."""
+
+    def __init__(self, timings=None):
+        self.timings = timings
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        if self.timings is not None:
+            self.timings[phase] = self.timings.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+def find_root(parent, x):
+    """Root of x in the union-find forest `parent` (a dict, x is added if new), halving the path."""
+    parent.setdefault(x, x)
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def union(parent, a, b):
+    """Merge the sets of a and b in `parent`; the root of a's set stays the root."""
+    ra, rb = find_root(parent, a), find_root(parent, b)
+    if ra != rb:
+        parent[rb] = ra
+
+
+def expand_sessions(batches, subjects):
+    """
+    For each subject a batch takes, create one session entry per weekly hour. A batch
+    without a curriculum takes every subject for the subject's hours_per_week.
+    Each session represents one class instance that must be scheduled into a timeslot.
+    Returns list of sessions where each is a dict with keys: id, batch_id, batch_ids, subject_id,
+    size, allowed_rooms, eligible_faculties, block, member.
+
+    batch_ids lists every batch attending (several for a combined class, whose batch_id is
+    the first of them in batch order). Sessions of split sections and electives carry a
+    `block` (e.g. "B1/S3" or "B1/elective:E1") and a `member` (section number or subject
+    id): sessions of one block with different members may share a timeslot, since they
+    are attended by different students of the batch. Both are None for whole-batch classes.
+    Sessions are numbered batch by batch, in subject order within a batch.
+    """
+    batch_by_id = {b.id: b for b in batches}
+    # Combined classes are emitted once, by the first of their batches. combined_with links
+    # chain (B1 with B2 and B3 with B2 is one class of B1, B2 and B3), so the linked
+    # (batch_id, subject_id) pairs are merged with a union-find.
+    parent = {}
+    declared = {}  # (batch_id, subject_id) -> the CurriculumEntry listing combined_with
+    for batch in batches:
+        for entry in batch.curriculum or ():
+            if entry.combined_with:
+                declared[(batch.id, entry.subject_id)] = entry
+                for other_id in entry.combined_with:
+                    if other_id in batch_by_id and other_id != batch.id:
+                        union(parent, (batch.id, entry.subject_id), (other_id, entry.subject_id))
+    batch_position = {b.id: i for i, b in enumerate(batches)}
+    groups = defaultdict(list)
+    for key in sorted(parent, key=lambda key: batch_position[key[0]]):
+        groups[find_root(parent, key)].append(key[0])
+    combined = {}
+    for root, group in groups.items():
+        subject_id = root[1]
+        # the class follows the first of its batches (in batch order) that declared it
+        entry = next(declared[(b, subject_id)] for b in group if (b, subject_id) in declared)
+        for batch_id in group:
+            combined[(batch_id, subject_id)] = (group, entry)
+
+    sessions = []
+    sid = 0
+    for batch in batches:
+        if batch.curriculum is None:
+            entries = {subj.id: CurriculumEntry(subj.id) for subj in subjects}
+        else:
+            entries = {entry.subject_id: entry for entry in batch.curriculum}
+        for subj in subjects:
+            batch_ids = [batch.id]
+            entry = entries.get(subj.id)
+            if (batch.id, subj.id) in combined:
+                batch_ids, entry = combined[(batch.id, subj.id)]
+                if batch_ids[0] != batch.id:
+                    continue
+            if entry is None:
+                continue
+            hours = entry.hours_per_week if entry.hours_per_week is not None else subj.hours_per_week
+            size = entry.size if entry.size is not None else sum(batch_by_id[b].size for b in batch_ids)
+            if entry.sections > 1:
+                parts = [(f"{batch.id}/{subj.id}", str(i + 1), -(-size // entry.sections))
+                         for i in range(entry.sections)]
+            elif entry.elective_group is not None:
+                parts = [(f"{batch.id}/elective:{entry.elective_group}", subj.id, size)]
+            else:
+                parts = [(None, None, size)]
+            for block, member, part_size in parts:
+                for _ in range(hours):
                     sessions.append({
                         'id': sid,
                         'batch_id': batch.id,
+                        'batch_ids': batch_ids,
                         'subject_id': subj.id,
-                        'size': batch.size,
+                        'size': part_size,
                         'allowed_rooms': subj.allowed_rooms,
                         'eligible_faculties': subj.eligible_faculties,
+                        'block': block,
+                        'member': member,
                     })
                     sid += 1
-        return sessions
-
-    # ------------------------ Optimization Engine ------------------------
-
-    def solve_timetables(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4, num_variants=2):
-        """
-        rooms: list of Room
-        faculties: list of Faculty
-        batches: list of Batch
-        subjects: list of Subject
-        utils: TimeTableUtils instance
-        fixed_slots: list of FixedSlot (optional) to force specific session -> timeslot/room/faculty
-        max_classes_per_day: soft/hard constraint for batch/faculty
-        num_variants: how many different timetable variants to return (tries to diversify between variants)
-
-        Returns list of solutions. Each solution is a list of assignments: (session_id, timeslot, room_id, faculty_id)
-        """
-        if fixed_slots is None:
-            fixed_slots = []
-
-        # Expand sessions
-        sessions = expand_sessions(batches, subjects)
-        S = len(sessions)
-        T = utils.T
-        R = len(rooms)
-
-        # Map id->index for easier loops
-        room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
-        faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
-        batch_id_to_obj = {b.id: b for b in batches}
-        subj_id_to_obj = {s.id: s for s in subjects}
-
-        # Precompute eligibility: for each session, which (room, faculty) are allowed
-        eligible_room_idxs = {}
-        eligible_faculty_idxs = {}
-        for sess in sessions:
-            rlist = [room_id_to_idx[rid] for rid in sess['allowed_rooms'] if rid in room_id_to_idx and rooms[room_id_to_idx[rid]].capacity >= sess['size']]
-            flist = [faculty_id_to_idx[fid] for fid in sess['eligible_faculties'] if fid in faculty_id_to_idx]
-            # If empty, allow any room with capacity and any faculty qualified for the subject (fallback)
-            if not rlist:
-                rlist = [i for i,r in enumerate(rooms) if r.capacity >= sess['size']]
-            eligible_room_idxs[sess['id']] = rlist
-            eligible_faculty_idxs[sess['id']] = flist
-
-        # Convert fixed_slots into dict by session id
-        fixed_map = {fs.session_idx: fs for fs in fixed_slots}
-
-        solutions = []
-        forbidden_solutions = []  # list of sets of true var tuples to forbid previously found solutions
-
-        # We'll run iterative solves to obtain multiple variants
-        for variant in range(num_variants):
-            model = cp_model.CpModel()
-
-            # Boolean assignment var: assign[(s,t,r,f)] = 1 if session s is assigned to timeslot t, room r, faculty f
-            assign = {}
-            for s in sessions:
-                sid = s['id']
-                for t in range(T):
-                    for r_idx in eligible_room_idxs[sid]:
-                        # For faculties, if eligible list is empty allow any faculty who can teach this subject
-                        fac_idxs = eligible_faculty_idxs[sid] if eligible_faculty_idxs[sid] else list(faculty_id_to_idx.values())
-                        for f_idx in fac_idxs:
-                            # check faculty availability for timeslot t
-                            fac = faculties[f_idx]
-                            if t not in fac.available_times:
-                                continue
-                            var = model.NewBoolVar(f"a_s{sid}_t{t}_r{r_idx}_f{f_idx}")
-                            assign[(sid, t, r_idx, f_idx)] = var
-
-            # Constraint: each session assigned exactly once
-            for s in sessions:
-                sid = s['id']
-                vars_for_session = [v for (ss,_,_,_), v in assign.items() if ss == sid]
-                if not vars_for_session:
-                    raise ValueError(f"No feasible assignment variables for session {sid}; check room/faculty availability and capacities")
-                model.Add(sum(vars_for_session) == 1)
-
-            # Constraint: no room double booking at same timeslot
-            for t in range(T):
-                for r_idx in range(R):
-                    vars_room_time = [v for (ss, tt, rr, ff), v in assign.items() if tt == t and rr == r_idx]
-                    if vars_room_time:
-                        model.Add(sum(vars_room_time) <= 1)
-
-            # Constraint: faculty can't teach >1 at same timeslot
-            F = len(faculties)
-            for t in range(T):
-                for f_idx in range(F):
-                    vars_fac_time = [v for (ss, tt, rr, ff), v in assign.items() if tt == t and ff == f_idx]
-                    if vars_fac_time:
-                        model.Add(sum(vars_fac_time) <= 1)
-
-            # Constraint: batch can't attend >1 class at same timeslot
-            for t in range(T):
-                for b in batches:
-                    vars_batch_time = [v for (ss, tt, rr, ff), v in assign.items() if tt == t and sessions[ss]['batch_id'] == b.id]
-                    if vars_batch_time:
-                        model.Add(sum(vars_batch_time) <= 1)
-
-            # Constraint: max classes per day for faculty and batch (hard constraint)
-            for day in range(utils.days):
-                timeslots_that_day = [utils.day_period_to_timeslot(day, p) for p in range(utils.periods_per_day)]
-                for f_idx in range(F):
-                    vars_fac_day = [v for (ss, tt, rr, ff), v in assign.items() if ff == f_idx and tt in timeslots_that_day]
-                    if vars_fac_day:
-                        model.Add(sum(vars_fac_day) <= max_classes_per_day)
-                for b in batches:
-                    vars_batch_day = [v for (ss, tt, rr, ff), v in assign.items() if sessions[ss]['batch_id'] == b.id and tt in timeslots_that_day]
-                    if vars_batch_day:
-                        model.Add(sum(vars_batch_day) <= max_classes_per_day)
-
-            # Fixed slots: force assignment
-            for fs in fixed_slots:
-                # session must be assigned to the exact timeslot/room/faculty
-                sid = fs.session_idx
-                t = fs.timeslot
-                r_idx = room_id_to_idx.get(fs.room, None) if fs.room is not None else None
-                f_idx = faculty_id_to_idx.get(fs.faculty, None) if fs.faculty is not None else None
-                # Build list of variables for that exact combination
-                matching_vars = []
-                for (ss, tt, rr, ff), v in assign.items():
-                    if ss == sid and tt == t and (r_idx is None or rr == r_idx) and (f_idx is None or ff == f_idx):
-                        matching_vars.append(v)
-                if not matching_vars:
-                    raise ValueError(f"No variable matches fixed slot for session {sid}")
-                model.Add(sum(matching_vars) == 1)
-
-            # Soft objectives: try to
-            # 1) minimize total "undesirable assignments" (e.g., assigning faculty in their less preferred periods)
-            # For prototype, we randomly mark late periods as undesirable for faculty to demonstrate soft penalty concept.
-            penalty_terms = []
+    return sessions
+
+
+# ------------------------ Optimization Engine ------------------------
+
+# Soft-constraint weights of the objective. Override per deployment by passing
+# `weights` (any subset of these keys) down from generate_timetable.
+DEFAULT_OBJECTIVE_WEIGHTS = {
+    "late_period": 10,     # per class in the last two periods of a day
+    "room_mismatch": 10,   # per class outside its subject's allowed rooms (capacity fallback)
+    "load_spread": 5,      # per class of difference between the busiest and least busy faculty
+}
+
+
+def penalty_weights(rooms, subjects, utils: TimeTableUtils, weights=None):
+    """
+    Precompute the per-assignment soft penalties once.
+    Returns (weights, period_weight, room_weight): the merged weights dict, a list indexed
+    by period and a dict keyed by (subject_id, room_idx) holding only non-zero entries.
+    """
+    weights = dict(DEFAULT_OBJECTIVE_WEIGHTS, **(weights or {}))
+    # discourage evening periods (period >= periods_per_day-2)
+    period_weight = [weights["late_period"] if p >= utils.periods_per_day - 2 else 0 for p in range(utils.periods_per_day)]
+    # prefer the subject's own rooms; only reachable through the capacity fallback
+    room_weight = {}
+    for subj in subjects:
+        if not subj.allowed_rooms or not weights["room_mismatch"]:
+            continue
+        allowed = set(subj.allowed_rooms)
+        for r_idx, room in enumerate(rooms):
+            if room.id not in allowed:
+                room_weight[(subj.id, r_idx)] = weights["room_mismatch"]
+    return weights, period_weight, room_weight
+
+
+DEFAULT_SOLVER_PROFILE = {
+    "max_time": 30.0,              # seconds per solve
+    "workers": 8,                  # CP-SAT search workers, capped to the machine's cores
+    "total_time": None,            # seconds for all variants of one request, shared out as they run
+    "relative_gap": None,          # stop a solve once |objective - bound| / |objective| is below this
+    "no_improvement_time": None,   # stop a solve after this many seconds without a better solution
+}
+
+
+def solver_profile(profile=None):
+    """DEFAULT_SOLVER_PROFILE merged with `profile`, workers capped to os.cpu_count()."""
+    profile = dict(DEFAULT_SOLVER_PROFILE, **(profile or {}))
+    profile["workers"] = max(1, min(int(profile["workers"]), os.cpu_count() or 1))
+    return profile
+
+
+def configure_solver(solver, profile, time_limit=None):
+    """Apply a merged solver profile; time_limit (s) overrides the profile's max_time."""
+    solver.parameters.max_time_in_seconds = profile["max_time"] if time_limit is None else time_limit
+    solver.parameters.num_search_workers = profile["workers"]
+    if profile["relative_gap"] is not None:
+        solver.parameters.relative_gap_limit = profile["relative_gap"]
+
+
+def identical_session_groups(sessions, fixed_slots=None):
+    """
+    Group the interchangeable copies `expand_sessions` creates for one (batch, subject)
+    pair (and section). Sessions pinned by a fixed slot are left out since they are no longer
+    interchangeable. Returns a list of session id lists, each in id order.
+    """
+    fixed_ids = {fs.session_idx for fs in (fixed_slots or [])}
+    groups = defaultdict(list)
+    for sess in sessions:
+        if sess['id'] not in fixed_ids:
+            groups[(sess['batch_id'], sess['subject_id'], sess['block'], sess['member'])].append(sess['id'])
+    return [sids for sids in groups.values() if len(sids) > 1]
+
+
+def compute_eligibility(sessions, rooms, faculties):
+    """
+    Precompute eligibility: for each session, which (room, faculty) indexes are allowed.
+    Returns (eligible_room_idxs, eligible_faculty_idxs), both dicts keyed by session id.
+    An empty faculty list means any faculty may teach the session.
+    """
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    eligible_room_idxs = {}
+    eligible_faculty_idxs = {}
+    for sess in sessions:
+        rlist = [room_id_to_idx[rid] for rid in sess['allowed_rooms'] if rid in room_id_to_idx and rooms[room_id_to_idx[rid]].capacity >= sess['size']]
+        flist = [faculty_id_to_idx[fid] for fid in sess['eligible_faculties'] if fid in faculty_id_to_idx]
+        # If empty, allow any room with capacity and any faculty qualified for the subject (fallback)
+        if not rlist:
+            rlist = [i for i, r in enumerate(rooms) if r.capacity >= sess['size']]
+        eligible_room_idxs[sess['id']] = rlist
+        eligible_faculty_idxs[sess['id']] = flist
+    return eligible_room_idxs, eligible_faculty_idxs
+
+
+def build_timetable_model(sessions, rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4, break_symmetry=False,
+                          extra_objective=None, timings=None, weights=None, assumptions=None):
+    """
+    Build the CP-SAT model for the expanded `sessions`.
+
+    Every constraint family reads from indexes that are filled while the
+    assignment variables are created, so building the model is linear in the
+    number of variables instead of re-scanning `assign` once per constraint.
+
+    break_symmetry: order the timeslots of identical (batch, subject) copies. Off by
+    default for this formulation: CP-SAT's own symmetry detection already handles
+    these copies and the extra linear orderings slowed our benchmark instances down.
+    extra_objective: optional callable(assign) returning a linear expression that is
+    added to the objective (used by solve_incremental for the perturbation cost).
+    timings: optional dict that receives seconds spent per build phase: eligibility,
+    variables, one "constraints:<family>" entry per constraint family, and objective.
+    weights: objective weights overriding DEFAULT_OBJECTIVE_WEIGHTS.
+    assumptions: optional dict. If given, every hard constraint group is only enforced by
+    a literal stored in it under (family, key): ("demand", (batch_id, subject_id)),
+    ("room", room_id), ("faculty", faculty_id), ("batch", batch_id), ("faculty_daily_cap",
+    faculty_id), ("batch_daily_cap", batch_id) and ("fixed_slot", index). Sessions or
+    fixed slots without variables then force their literal false instead of raising
+    ValueError. Used by feasibility.diagnose_infeasibility.
+
+    Returns (model, assign) where assign[(s,t,r,f)] is the boolean assignment var.
+    """
+    if fixed_slots is None:
+        fixed_slots = []
+    timer = PhaseTimer(timings)
+
+    S = len(sessions)
+    T = utils.T
+    F = len(faculties)
+
+    # Map id->index for easier loops
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    fac_available = [set(f.available_times) for f in faculties]
+
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    timer.lap("eligibility")
+
+    model = cp_model.CpModel()
+
+    def guard(family, key):
+        if (family, key) not in assumptions:
+            assumptions[(family, key)] = model.NewBoolVar(f"assume_{family}_{key}")
+        return assumptions[(family, key)]
+
+    def enforce(constraint, family, key):
+        if assumptions is not None:
+            constraint.OnlyEnforceIf(guard(family, key))
+
+    # Boolean assignment var: assign[(s,t,r,f)] = 1 if session s is assigned to timeslot t, room r, faculty f
+    assign = {}
+    # Indexes over `assign`, filled once while the variables are created
+    keys_by_session = defaultdict(list)
+    vars_by_room_time = defaultdict(list)
+    vars_by_fac_time = defaultdict(list)
+    vars_by_batch_time = defaultdict(list)
+    vars_by_block_time = defaultdict(list)
+    vars_by_member_time = defaultdict(list)
+    vars_by_fac_day = defaultdict(list)
+    vars_by_batch_day = defaultdict(list)
+    vars_by_fac = defaultdict(list)
+    for s in sessions:
+        sid = s['id']
+        block = s['block']
+        # For faculties, if eligible list is empty allow any faculty who can teach this subject
+        fac_idxs = eligible_faculty_idxs[sid] if eligible_faculty_idxs[sid] else list(faculty_id_to_idx.values())
+        for t in range(T):
+            day, _ = utils.timeslot_to_day_period(t)
+            for r_idx in eligible_room_idxs[sid]:
+                for f_idx in fac_idxs:
+                    # check faculty availability for timeslot t
+                    if t not in fac_available[f_idx]:
+                        continue
+                    var = model.NewBoolVar(f"a_s{sid}_t{t}_r{r_idx}_f{f_idx}")
+                    key = (sid, t, r_idx, f_idx)
+                    assign[key] = var
+                    keys_by_session[sid].append(key)
+                    vars_by_room_time[(t, r_idx)].append(var)
+                    vars_by_fac_time[(t, f_idx)].append(var)
+                    vars_by_fac_day[(day, f_idx)].append(var)
+                    vars_by_fac[f_idx].append(var)
+                    if block is None:
+                        for batch_id in s['batch_ids']:
+                            vars_by_batch_time[(t, batch_id)].append(var)
+                            vars_by_batch_day[(day, batch_id)].append(var)
+                    else:
+                        vars_by_block_time[(t, block)].append(var)
+                        vars_by_member_time[(t, block, s['member'])].append(var)
+
+    # A block (split sections, electives) occupies its batch for one class whenever any member meets
+    block_batch = {s['block']: s['batch_id'] for s in sessions if s['block'] is not None}
+    for (t, block), vars_block_time in vars_by_block_time.items():
+        day, _ = utils.timeslot_to_day_period(t)
+        occupied = model.NewBoolVar(f"o_{block}_t{t}")
+        for var in vars_block_time:
+            model.AddImplication(var, occupied)
+        vars_by_batch_time[(t, block_batch[block])].append(occupied)
+        vars_by_batch_day[(day, block_batch[block])].append(occupied)
+    timer.lap("variables")
+
+    # Constraint: each session assigned exactly once
+    for s in sessions:
+        sid = s['id']
+        vars_for_session = [assign[key] for key in keys_by_session[sid]]
+        if not vars_for_session:
+            if assumptions is None:
+                raise ValueError(f"No feasible assignment variables for session {sid}; check room/faculty availability and capacities")
+            model.AddBoolOr([guard("demand", (s['batch_id'], s['subject_id'])).Not()])
+            continue
+        enforce(model.Add(sum(vars_for_session) == 1), "demand", (s['batch_id'], s['subject_id']))
+    timer.lap("constraints:exactly_once")
+
+    # Constraint: no room double booking at same timeslot
+    for (t, r_idx), vars_room_time in vars_by_room_time.items():
+        if len(vars_room_time) > 1:
+            enforce(model.Add(sum(vars_room_time) <= 1), "room", rooms[r_idx].id)
+    timer.lap("constraints:room_clash")
+
+    # Constraint: faculty can't teach >1 at same timeslot
+    for (t, f_idx), vars_fac_time in vars_by_fac_time.items():
+        if len(vars_fac_time) > 1:
+            enforce(model.Add(sum(vars_fac_time) <= 1), "faculty", faculties[f_idx].id)
+    timer.lap("constraints:faculty_clash")
+
+    # Constraint: batch can't attend >1 class at same timeslot
+    for (t, batch_id), vars_batch_time in vars_by_batch_time.items():
+        if len(vars_batch_time) > 1:
+            enforce(model.Add(sum(vars_batch_time) <= 1), "batch", batch_id)
+    # ... and a section or elective meets once at a time
+    for (t, block, _), vars_member_time in vars_by_member_time.items():
+        if len(vars_member_time) > 1:
+            enforce(model.Add(sum(vars_member_time) <= 1), "batch", block_batch[block])
+    timer.lap("constraints:batch_clash")
+
+    # Constraint: max classes per day for faculty and batch (hard constraint)
+    for (day, f_idx), vars_fac_day in vars_by_fac_day.items():
+        enforce(model.Add(sum(vars_fac_day) <= max_classes_per_day), "faculty_daily_cap", faculties[f_idx].id)
+    for (day, batch_id), vars_batch_day in vars_by_batch_day.items():
+        enforce(model.Add(sum(vars_batch_day) <= max_classes_per_day), "batch_daily_cap", batch_id)
+    timer.lap("constraints:daily_caps")
+
+    # Fixed slots: force assignment
+    for i, fs in enumerate(fixed_slots):
+        # session must be assigned to the exact timeslot/room/faculty
+        sid = fs.session_idx
+        t = fs.timeslot
+        r_idx = room_id_to_idx.get(fs.room, None) if fs.room is not None else None
+        f_idx = faculty_id_to_idx.get(fs.faculty, None) if fs.faculty is not None else None
+        # Build list of variables for that exact combination
+        matching_vars = []
+        for (ss, tt, rr, ff) in keys_by_session.get(sid, []):
+            if tt == t and (r_idx is None or rr == r_idx) and (f_idx is None or ff == f_idx):
+                matching_vars.append(assign[(ss, tt, rr, ff)])
+        if not matching_vars:
+            if assumptions is None:
+                raise ValueError(f"No variable matches fixed slot for session {sid}")
+            model.AddBoolOr([guard("fixed_slot", i).Not()])
+            continue
+        enforce(model.Add(sum(matching_vars) == 1), "fixed_slot", i)
+    timer.lap("constraints:fixed_slots")
+
+    # Symmetry breaking: copies of the same (batch, subject) are interchangeable, so
+    # force them into increasing timeslots (strict, the batch can't attend two at once)
+    for sids in (identical_session_groups(sessions, fixed_slots) if break_symmetry else []):
+        timeslot_of = [sum(key[1] * assign[key] for key in keys_by_session[sid]) for sid in sids]
+        for earlier, later in zip(timeslot_of, timeslot_of[1:]):
+            model.Add(earlier < later)
+    timer.lap("constraints:symmetry")
+
+    # Soft objectives: minimize total "undesirable assignments" (late periods, rooms outside the
+    # subject's list) as a weighted sum directly over the assignment booleans
+    weights, period_weight, room_weight = penalty_weights(rooms, subjects, utils, weights)
+    penalty_vars = []
+    penalty_coeffs = []
+    for (ss, tt, rr, ff), v in assign.items():
+        w = period_weight[tt % utils.periods_per_day] + room_weight.get((sessions[ss]['subject_id'], rr), 0)
+        if w:
+            penalty_vars.append(v)
+            penalty_coeffs.append(w)
+
+    # Faculty load balancing: minimize the variance of assigned classes across faculties (soft)
+    load_vars = []
+    for f_idx in range(F):
+        load = model.NewIntVar(0, S, f"load_f{f_idx}")
+        vars_fac = vars_by_fac[f_idx]
+        if vars_fac:
+            model.Add(load == sum(vars_fac))
+        else:
+            model.Add(load == 0)
+        load_vars.append(load)
+    # compute average load as int
+    avg_load_num = model.NewIntVar(0, S * F, "avg_load_num")
+    model.Add(avg_load_num * 1 == sum(load_vars))  # avg_load_num will be sum(loads)
+    # minimize sum of absolute deviations from mean is tricky; approximate by minimizing max_load - min_load
+    max_load = model.NewIntVar(0, S, "max_load")
+    min_load = model.NewIntVar(0, S, "min_load")
+    model.AddMaxEquality(max_load, load_vars)
+    model.AddMinEquality(min_load, load_vars)
+
+    # Objective: weighted sum of penalties + spread (max-min)
+    objective = cp_model.LinearExpr.WeightedSum(penalty_vars, penalty_coeffs) + (max_load - min_load) * weights["load_spread"]
+    if extra_objective is not None:
+        objective += extra_objective(assign)
+    model.Minimize(objective)
+    timer.lap("objective")
+
+    return model, assign
+
+
+def build_decomposed_model(sessions, rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4, timings=None,
+                           weights=None):
+    """
+    Decomposed alternative to `build_timetable_model`.
+
+    Instead of one boolean per (session, timeslot, room, faculty) tuple, every session
+    gets three small integer choices: its timeslot, room and faculty. Clashes are
+    expressed with AllDifferent over combined (timeslot, room) / (timeslot, faculty)
+    codes and over the timeslots of each batch; faculty availability is a table
+    constraint on (timeslot, faculty). Booleans are only created where a linear
+    constraint or the objective needs them (faculty choice, day, late period).
+
+    timings: optional dict that receives seconds spent per build phase, keyed like
+    build_timetable_model's; per-session channeling is counted under "variables".
+    weights: objective weights overriding DEFAULT_OBJECTIVE_WEIGHTS.
+
+    Batch clashes are AllDifferent over whole timeslots, so curricula with split sections
+    or electives (sessions with a `block`) raise ValueError; use the assignment formulation.
+
+    Returns (model, choice) where choice[sid] = (t_var, r_var, f_var).
+    """
+    if fixed_slots is None:
+        fixed_slots = []
+    if any(s['block'] is not None for s in sessions):
+        raise ValueError("The decomposed formulation doesn't support split sections or electives; "
+                         "use formulation='assignment'")
+    timer = PhaseTimer(timings)
+
+    S = len(sessions)
+    T = utils.T
+    R = len(rooms)
+    F = len(faculties)
+    P = utils.periods_per_day
+
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    fac_available = [set(f.available_times) for f in faculties]
+
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    weights, period_weight, room_weight = penalty_weights(rooms, subjects, utils, weights)
+    late_timeslots = [t for t in range(T) if period_weight[t % P]]
+    early_timeslots = [t for t in range(T) if not period_weight[t % P]]
+    timer.lap("eligibility")
+
+    model = cp_model.CpModel()
+
+    choice = {}
+    room_codes = []
+    fac_codes = []
+    times_by_batch = defaultdict(list)
+    day_bools_by_batch = defaultdict(list)
+    fac_day_bools = defaultdict(list)
+    fac_bools = defaultdict(list)
+    penalty_terms = []
+    for s in sessions:
+        sid = s['id']
+        rlist = eligible_room_idxs[sid]
+        fac_idxs = eligible_faculty_idxs[sid] if eligible_faculty_idxs[sid] else list(range(F))
+        # Allowed (timeslot, faculty) pairs given faculty availability
+        pairs = [(t, f_idx) for f_idx in fac_idxs for t in range(T) if t in fac_available[f_idx]]
+        if not rlist or not pairs:
+            raise ValueError(f"No feasible assignment variables for session {sid}; check room/faculty availability and capacities")
+
+        t_var = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted({t for t, _ in pairs})), f"t_s{sid}")
+        r_var = model.NewIntVarFromDomain(cp_model.Domain.FromValues(rlist), f"r_s{sid}")
+        f_var = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted({f for _, f in pairs})), f"f_s{sid}")
+        model.AddAllowedAssignments([t_var, f_var], pairs)
+
+        # Combined codes: equal codes <=> same timeslot and same room/faculty
+        room_code = model.NewIntVar(0, T * R - 1, f"tr_s{sid}")
+        model.Add(room_code == t_var * R + r_var)
+        fac_code = model.NewIntVar(0, T * F - 1, f"tf_s{sid}")
+        model.Add(fac_code == t_var * F + f_var)
+        room_codes.append(room_code)
+        fac_codes.append(fac_code)
+        for batch_id in s['batch_ids']:
+            times_by_batch[batch_id].append(t_var)
+        choice[sid] = (t_var, r_var, f_var)
+
+        # Day of the session, channeled to one boolean per day
+        day_var = model.NewIntVar(0, utils.days - 1, f"d_s{sid}")
+        model.AddDivisionEquality(day_var, t_var, P)
+        day_bools = [model.NewBoolVar(f"d_s{sid}_{d}") for d in range(utils.days)]
+        model.AddMapDomain(day_var, day_bools)
+
+        # Faculty choice, channeled to one boolean per eligible faculty
+        f_bools = {}
+        for f_idx in sorted({f for _, f in pairs}):
+            b = model.NewBoolVar(f"f_s{sid}_{f_idx}")
+            model.Add(f_var == f_idx).OnlyEnforceIf(b)
+            model.Add(f_var != f_idx).OnlyEnforceIf(b.Not())
+            f_bools[f_idx] = b
+            fac_bools[f_idx].append(b)
+        model.AddExactlyOne(f_bools.values())
+
+        for d, d_bool in enumerate(day_bools):
+            for batch_id in s['batch_ids']:
+                day_bools_by_batch[(d, batch_id)].append(d_bool)
+            for f_idx, f_bool in f_bools.items():
+                # fd >= f_bool AND d_bool; an upper bound is all the caps below need
+                fd = model.NewBoolVar(f"fd_s{sid}_{f_idx}_{d}")
+                model.AddBoolOr([f_bool.Not(), d_bool.Not(), fd])
+                fac_day_bools[(d, f_idx)].append(fd)
+
+        # Soft objectives, same terms as the assignment formulation
+        if late_timeslots:
+            late = model.NewBoolVar(f"late_s{sid}")
+            model.AddLinearExpressionInDomain(t_var, cp_model.Domain.FromValues(late_timeslots)).OnlyEnforceIf(late)
+            if early_timeslots:
+                model.AddLinearExpressionInDomain(t_var, cp_model.Domain.FromValues(early_timeslots)).OnlyEnforceIf(late.Not())
+            penalty_terms.append((weights["late_period"], late))
+        for r_idx in rlist:
+            w = room_weight.get((s['subject_id'], r_idx), 0)
+            if w:
+                y = model.NewBoolVar(f"r_s{sid}_{r_idx}")
+                model.Add(r_var == r_idx).OnlyEnforceIf(y)
+                model.Add(r_var != r_idx).OnlyEnforceIf(y.Not())
+                penalty_terms.append((w, y))
+    timer.lap("variables")
+
+    # Constraint: no room / faculty double booking at same timeslot
+    model.AddAllDifferent(room_codes)
+    model.AddAllDifferent(fac_codes)
+    timer.lap("constraints:room_faculty_clash")
+
+    # Constraint: batch can't attend >1 class at same timeslot
+    for t_vars in times_by_batch.values():
+        if len(t_vars) > 1:
+            model.AddAllDifferent(t_vars)
+    timer.lap("constraints:batch_clash")
+
+    # Constraint: max classes per day for faculty and batch (hard constraint)
+    for bools in fac_day_bools.values():
+        model.Add(sum(bools) <= max_classes_per_day)
+    for bools in day_bools_by_batch.values():
+        model.Add(sum(bools) <= max_classes_per_day)
+    timer.lap("constraints:daily_caps")
+
+    # Fixed slots: force assignment
+    for fs in fixed_slots:
+        sid = fs.session_idx
+        if sid not in choice:
+            raise ValueError(f"No variable matches fixed slot for session {sid}")
+        t_var, r_var, f_var = choice[sid]
+        model.Add(t_var == fs.timeslot)
+        if fs.room is not None:
+            if fs.room not in room_id_to_idx:
+                raise ValueError(f"No variable matches fixed slot for session {sid}")
+            model.Add(r_var == room_id_to_idx[fs.room])
+        if fs.faculty is not None:
+            if fs.faculty not in faculty_id_to_idx:
+                raise ValueError(f"No variable matches fixed slot for session {sid}")
+            model.Add(f_var == faculty_id_to_idx[fs.faculty])
+    timer.lap("constraints:fixed_slots")
+
+    # Symmetry breaking: identical copies take increasing timeslots (cheap on integer
+    # vars, and add_decomposed_no_good_cut relies on it)
+    for sids in identical_session_groups(sessions, fixed_slots):
+        for earlier, later in zip(sids, sids[1:]):
+            model.Add(choice[earlier][0] < choice[later][0])
+    timer.lap("constraints:symmetry")
+
+    # Faculty load balancing: minimize max_load - min_load
+    load_vars = []
+    for f_idx in range(F):
+        load = model.NewIntVar(0, S, f"load_f{f_idx}")
+        model.Add(load == sum(fac_bools[f_idx]))
+        load_vars.append(load)
+    max_load = model.NewIntVar(0, S, "max_load")
+    min_load = model.NewIntVar(0, S, "min_load")
+    model.AddMaxEquality(max_load, load_vars)
+    model.AddMinEquality(min_load, load_vars)
+
+    model.Minimize(sum(w * v for w, v in penalty_terms) + (max_load - min_load) * weights["load_spread"])
+    timer.lap("objective")
+
+    return model, choice
+
+
+def add_solution_hint(model, assign, true_vars, decomposed=False):
+    """
+    Replace the model's hints with a known solution given as (sid,t,r_idx,f_idx) tuples.
+    assign is the assignment dict, or the per-session choice dict if decomposed.
+    """
+    model.ClearHints()
+    if decomposed:
+        for sid, t, r_idx, f_idx in true_vars:
+            t_var, r_var, f_var = assign[sid]
+            model.AddHint(t_var, t)
+            model.AddHint(r_var, r_idx)
+            model.AddHint(f_var, f_idx)
+    else:
+        hinted = set(true_vars)
+        for key, v in assign.items():
+            model.AddHint(v, 1 if key in hinted else 0)
+
+
+def triple_presence(model, assign, sessions):
+    """
+    Per (batch, subject, timeslot) triple, a 0/1 expression that is 1 iff the triple is
+    scheduled, for add_no_good_cut. Build it once per model and reuse it for every cut.
+
+    Whole-batch classes use the sum of their assignment vars directly (the batch clash
+    constraint already keeps it <= 1). Only triples of a split section or elective block,
+    which may hold several classes in one timeslot, get a presence literal (their max).
+    """
+    vars_by_triple = defaultdict(list)
+    blocked = set()
+    for (sid, t, _, _), v in assign.items():
+        triple = (sessions[sid]['batch_id'], sessions[sid]['subject_id'], t)
+        vars_by_triple[triple].append(v)
+        if sessions[sid]['block'] is not None:
+            blocked.add(triple)
+    presence = {}
+    for triple, triple_vars in vars_by_triple.items():
+        if len(triple_vars) == 1:
+            presence[triple] = triple_vars[0]
+        elif triple in blocked:
+            present = model.NewBoolVar("")
+            model.AddMaxEquality(present, triple_vars)
+            presence[triple] = present
+        else:
+            presence[triple] = cp_model.LinearExpr.Sum(triple_vars)
+    return presence
+
+
+def add_no_good_cut(model, assign, true_vars, sessions, presence=None):
+    """
+    Forbid a previously found solution: at least one (batch, subject, timeslot) must differ.
+    true_vars is a list of tuples (sid,t,r,f) that were True in that solution.
+    presence: triple_presence(model, assign, sessions), built here if not given; pass it
+    when adding several cuts to one model so they share its literals.
+
+    Comparing at the (batch, subject, timeslot) level means swapping identical session
+    copies does not count as a new variant.
+    """
+    if presence is None:
+        presence = triple_presence(model, assign, sessions)
+    prev = {(sessions[sid]['batch_id'], sessions[sid]['subject_id'], t) for sid, t, _, _ in true_vars}
+    differs = [1 - present if triple in prev else present for triple, present in presence.items()]
+    if differs:
+        model.Add(cp_model.LinearExpr.Sum(differs) >= 1)
+
+
+def add_decomposed_no_good_cut(model, choice, true_vars):
+    """
+    Same as `add_no_good_cut` for the decomposed formulation. Identical copies are kept
+    in timeslot order by symmetry breaking, so a different (batch, subject, timeslot)
+    pattern is equivalent to at least one session getting a different timeslot.
+    """
+    differs = []
+    for sid, t, _, _ in true_vars:
+        d = model.NewBoolVar("")
+        model.Add(choice[sid][0] != t).OnlyEnforceIf(d)
+        differs.append(d)
+    if differs:
+        model.AddBoolOr(differs)
+
+
+def run_solver(solver, model, cancel_event=None, callback=None, no_improvement_time=None):
+    """
+    solver.Solve(model, callback), but stop the search as soon as `cancel_event` (anything
+    with wait(timeout), e.g. a threading or multiprocessing Event) is set, or, given
+    no_improvement_time, once `callback` (a telemetry.SolveTelemetry) has seen no better
+    solution for that many seconds after the first one.
+    """
+    if cancel_event is None and no_improvement_time is None:
+        return solver.Solve(model, callback)
+
+    done = threading.Event()
+
+    def watch():
+        while not done.is_set():
+            if cancel_event is not None and cancel_event.wait(0.2):
+                solver.StopSearch()
+                return
+            if cancel_event is None:
+                done.wait(0.2)
+            last = callback.last_improvement if no_improvement_time is not None else None
+            if last is not None and time.perf_counter() - last >= no_improvement_time:
+                solver.StopSearch()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        return solver.Solve(model, callback)
+    finally:
+        done.set()
+        watcher.join()
+
+
+def solve_timetables(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4, num_variants=2, reuse_model=True, formulation="assignment", break_symmetry=False,
+                     progress_callback=None, cancel_event=None, hint=None, weights=None, metrics=None, on_incumbent=None,
+                     profile=None):
+    """
+    rooms: list of Room
+    faculties: list of Faculty
+    batches: list of Batch
+    subjects: list of Subject
+    utils: TimeTableUtils instance
+    fixed_slots: list of FixedSlot (optional) to force specific session -> timeslot/room/faculty
+    max_classes_per_day: soft/hard constraint for batch/faculty
+    num_variants: how many different timetable variants to return (tries to diversify between variants)
+    reuse_model: build the model once and only add the newest no-good cut before each re-solve,
+        hinting the previous solution. If False, the model is rebuilt from scratch for every variant.
+    formulation: "assignment" (one boolean per feasible (session, timeslot, room, faculty) tuple) or
+        "decomposed" (separate timeslot/room/faculty choices per session, see build_decomposed_model).
+    break_symmetry: order identical session copies by timeslot in the assignment formulation
+        (the decomposed formulation always does).
+    progress_callback: optional callable(variants_done, num_variants) called after each variant
+    cancel_event: optional Event; once set the running search is stopped and no further variants are tried
+    hint: optional solution (list of (session_id, timeslot, room_id, faculty_id), e.g. from the
+        heuristic engine) used as the CP-SAT hint for the first variant
+    weights: objective weights overriding DEFAULT_OBJECTIVE_WEIGHTS
+    metrics: optional dict filled with solver telemetry: "build" (seconds per build phase and
+        constraint family) and "variants" (one telemetry.SolveTelemetry summary per solve)
+    on_incumbent: optional callable(variant, info, solution) called for every improving
+        solution found during the search; solution() extracts the incumbent's assignment
+        list, see telemetry.SolveTelemetry
+    profile: solver resource profile overriding DEFAULT_SOLVER_PROFILE. With total_time the
+        first variant may use half of it and every later one an equal share of what is left,
+        so time a variant saves by stopping early (optimal, relative_gap or
+        no_improvement_time) goes to the ones after it.
+
+    Returns list of solutions. Each solution is a list of assignments: (session_id, timeslot, room_id, faculty_id)
+    """
+    if fixed_slots is None:
+        fixed_slots = []
+
+    # Expand sessions
+    sessions = expand_sessions(batches, subjects)
+
+    solutions = []
+    forbidden_solutions = []  # list of sets of true var tuples to forbid previously found solutions
+
+    if formulation not in ("assignment", "decomposed"):
+        raise ValueError(f"Unknown formulation {formulation!r}")
+    decomposed = formulation == "decomposed"
+    if decomposed:
+        build_model = build_decomposed_model
+    else:
+        def build_model(*args, **kwargs):
+            return build_timetable_model(*args, break_symmetry=break_symmetry, **kwargs)
+
+    presence = {}  # triple_presence of the current model, shared by its cuts
+
+    def add_cut(model, assign, forb):
+        if decomposed:
+            add_decomposed_no_good_cut(model, assign, forb)
+            return
+        if presence.get("model") is not model:
+            presence.update(model=model, triples=triple_presence(model, assign, sessions))
+        add_no_good_cut(model, assign, forb, sessions, presence=presence["triples"])
+
+    if metrics is not None:
+        metrics.setdefault("build", {})
+        metrics.setdefault("variants", [])
+    build_timings = metrics["build"] if metrics is not None else None
+
+    def extract(source):
+        """(session_id, timeslot, room_id, faculty_id) list and (sid,t,r,f) index tuples from a solver or callback."""
+        sol_assignment = []
+        true_vars = []
+        if decomposed:
+            for ss, (t_var, r_var, f_var) in assign.items():
+                tt, rr, ff = source.Value(t_var), source.Value(r_var), source.Value(f_var)
+                sol_assignment.append((ss, tt, rooms[rr].id, faculties[ff].id))
+                true_vars.append((ss, tt, rr, ff))
+        else:
             for (ss, tt, rr, ff), v in assign.items():
-                fac = faculties[ff]
-                day, period = utils.timeslot_to_day_period(tt)
-                # example: discourage evening periods (period >= periods_per_day-2)
-                if period >= utils.periods_per_day - 2:
-                    w = 1
-                    penalty_terms.append((w, v))
-                # example: prefer assigning subject to labs or special room types; penalize if room type doesn't match
-                subj_id = sessions[ss]['subject_id']
-                subj = subj_id_to_obj[subj_id]
-                room = rooms[rr]
-                if subj.allowed_rooms and rr not in [room_id_to_idx[rid] for rid in subj.allowed_rooms]:
-                    # if this room is not in allowed list, add mild penalty
-                    penalty_terms.append((1, v))
-
-            # Compose objective: minimize sum of penalties (weighted) and also try to balance faculty loads
-            penalty_vars = []
-            for w, var in penalty_terms:
-                # model doesn't allow weighted bool in linear objective directly, so we create int var to represent penalty contribution
-                p = model.NewIntVar(0, w, f"pen_{var.Name()}")
-                model.Add(p == var * w)
-                penalty_vars.append(p)
-
-            # Faculty load balancing: minimize the variance of assigned classes across faculties (soft)
-            load_vars = []
-            for f_idx in range(F):
-                load = model.NewIntVar(0, S, f"load_f{f_idx}")
-                vars_fac = [v for (ss, tt, rr, ff), v in assign.items() if ff == f_idx]
-                if vars_fac:
-                    model.Add(load == sum(vars_fac))
-                else:
-                    model.Add(load == 0)
-                load_vars.append(load)
-            # compute average load as int
-            avg_load_num = model.NewIntVar(0, S * F, "avg_load_num")
-            model.Add(avg_load_num * 1 == sum(load_vars))  # avg_load_num will be sum(loads)
-            # minimize sum of absolute deviations from mean is tricky; approximate by minimizing max_load - min_load
-            max_load = model.NewIntVar(0, S, "max_load")
-            min_load = model.NewIntVar(0, S, "min_load")
-            model.AddMaxEquality(max_load, load_vars)
-            model.AddMinEquality(min_load, load_vars)
-
-            # Objective: weighted sum of penalties + spread (max-min)
-            model.Minimize(sum(penalty_vars) * 10 + (max_load - min_load) * 5)
+                if source.Value(v) == 1:
+                    sol_assignment.append((ss, tt, rooms[rr].id, faculties[ff].id))
+                    true_vars.append((ss, tt, rr, ff))
+        return sol_assignment, true_vars
+
+    profile = solver_profile(profile)
+    deadline = None
+    if profile["total_time"] is not None:
+        deadline = time.perf_counter() + profile["total_time"]
 
+    model, assign = None, None
+
+    # We'll run iterative solves to obtain multiple variants
+    for variant in range(num_variants):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        time_limit = None
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            # the first variant starts without a hint and is the hard one: it may use half
+            # the budget, later variants split what is left evenly
+            share = remaining / 2 if variant == 0 and num_variants > 1 else remaining / (num_variants - variant)
+            time_limit = min(profile["max_time"], share)
+        if model is None or not reuse_model:
+            model, assign = build_model(sessions, rooms, faculties, batches, subjects, utils,
+                                        fixed_slots=fixed_slots, max_classes_per_day=max_classes_per_day, weights=weights,
+                                        timings=build_timings)
             # Forbid previously found solutions (to obtain diverse variants)
             for forb in forbidden_solutions:
-                # forb is a list of tuples (sid,t,r,f) that were True in previous solution
-                # Add constraint: sum(those vars) <= len(forb)-1  => at least one assignment must differ
-                vars_to_forbid = []
-                for tup in forb:
-                    if tup in assign:
-                        vars_to_forbid.append(assign[tup])
-                if vars_to_forbid:
-                    model.Add(sum(vars_to_forbid) <= len(vars_to_forbid) - 1)
-
-            # Solve
-            solver = cp_model.CpSolver()
-            solver.parameters.max_time_in_seconds = 30.0
-            solver.parameters.num_search_workers = 8
-            solver.parameters.maximize = False
-
-            result = solver.Solve(model)
-            if result not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                add_cut(model, assign, forb)
+            if hint and not forbidden_solutions:
+                room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+                faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+                add_solution_hint(model, assign, [(sid, t, room_id_to_idx[rid], faculty_id_to_idx[fid])
+                                                  for sid, t, rid, fid in hint], decomposed)
+        elif forbidden_solutions:
+            # The reused model already carries the older cuts; add only the newest
+            # one and start the search from the previous solution.
+            prev = forbidden_solutions[-1]
+            add_cut(model, assign, prev)
+            add_solution_hint(model, assign, prev, decomposed)
+
+        # Solve
+        solver = cp_model.CpSolver()
+        configure_solver(solver, profile, time_limit)
+
+        telemetry = None
+        if metrics is not None or on_incumbent is not None or profile["no_improvement_time"] is not None:
+            listener = (lambda info, solution, variant=variant: on_incumbent(variant, info, solution)) \
+                if on_incumbent is not None else None
+            telemetry = SolveTelemetry(extract=lambda cb: extract(cb)[0], on_incumbent=listener)
+            if metrics is not None:
+                telemetry.attach(solver)
+
+        result = run_solver(solver, model, cancel_event, telemetry, profile["no_improvement_time"])
+        if metrics is not None:
+            metrics["variants"].append(dict(telemetry.summary(solver, result), variant=variant))
+        if result not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            if cancel_event is None or not cancel_event.is_set():
                 print(f"Variant {variant}: No feasible solution found")
-                break
+            break
 
-            # Collect solution assignments
-            sol_assignment = []
-            true_vars = []
-            for (ss, tt, rr, ff), v in assign.items():
-                if solver.Value(v) == 1:
-                    sol_assignment.append((ss, tt, rooms[rr].id, faculties[ff].id))
-                    true_vars.append((ss, tt, rr, ff))
+        # Collect solution assignments
+        sol_assignment, true_vars = extract(solver)
+
+        solutions.append(sol_assignment)
+        forbidden_solutions.append(true_vars)
+        if progress_callback is not None:
+            progress_callback(len(solutions), num_variants)
+
+    return solutions
+
+
+def find_components(rooms, faculties, batches, subjects):
+    """
+    Split the instance into independent sub-problems.
+
+    Builds the resource-sharing graph over batches, faculties and rooms (a batch is
+    linked to every room and faculty any of its sessions may use, and to the batches it
+    shares a combined class with) and returns its
+    connected components as a list of (batch_idxs, room_idxs, faculty_idxs), each
+    sorted. Faculties and rooms no batch can use are left out.
+    """
+    sessions = expand_sessions(batches, subjects)
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    batch_id_to_idx = {b.id: i for i, b in enumerate(batches)}
+
+    # union-find over nodes ("b", i), ("r", i), ("f", i)
+    parent = {}
+    for i in range(len(batches)):
+        find_root(parent, ("b", i))
+    for sess in sessions:
+        node = ("b", batch_id_to_idx[sess['batch_id']])
+        for batch_id in sess['batch_ids']:
+            # batches of a combined class share its sessions
+            union(parent, node, ("b", batch_id_to_idx[batch_id]))
+        for r_idx in eligible_room_idxs[sess['id']]:
+            union(parent, node, ("r", r_idx))
+        fac_idxs = eligible_faculty_idxs[sess['id']] or range(len(faculties))
+        for f_idx in fac_idxs:
+            union(parent, node, ("f", f_idx))
+
+    groups = defaultdict(lambda: {"b": [], "r": [], "f": []})
+    for node in list(parent):
+        kind, idx = node
+        groups[find_root(parent, node)][kind].append(idx)
+    components = [(sorted(g["b"]), sorted(g["r"]), sorted(g["f"])) for g in groups.values() if g["b"]]
+    components.sort()
+    return components
+
+
+def solve_timetables_sharded(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4, num_variants=2,
+                             max_workers=None, **solve_kwargs):
+    """
+    Same inputs and output as solve_timetables, but every connected component of the
+    resource-sharing graph (see find_components) is solved as its own model, in parallel
+    on a process pool of `max_workers` (default: the profile's workers, at most one process
+    per component). Results are merged back into global session ids. The profile's search
+    workers are split evenly between the concurrent shards, so one sharded solve uses no
+    more cores than an unsharded one.
+
+    Variant i of the merged result combines variant i of every component; a component
+    that ran out of distinct variants repeats its last one. Faculty load balancing is
+    done per component. A hint (global session ids) is split between the components.
+    Returns [] if any component is infeasible.
+    """
+    if fixed_slots is None:
+        fixed_slots = []
+
+    profile = solver_profile(solve_kwargs.pop("profile", None))
+    hint = solve_kwargs.pop("hint", None)
+
+    components = find_components(rooms, faculties, batches, subjects)
+    if len(components) <= 1:
+        return solve_timetables(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                max_classes_per_day=max_classes_per_day, num_variants=num_variants, profile=profile,
+                                hint=hint, **solve_kwargs)
+
+    if max_workers is None:
+        max_workers = profile["workers"]
+    max_workers = max(1, min(max_workers, len(components)))
+    per_shard = dict(profile, workers=max(1, profile["workers"] // max_workers))
+
+    # Global session ids of every batch; expand_sessions numbers them batch by batch
+    sessions = expand_sessions(batches, subjects)
+    sids_by_batch = defaultdict(list)
+    for sess in sessions:
+        sids_by_batch[sess['batch_id']].append(sess['id'])
+
+    shards = []
+    for batch_idxs, room_idxs, faculty_idxs in components:
+        shard_batches = [batches[i] for i in batch_idxs]
+        local_to_global = [sid for b in shard_batches for sid in sids_by_batch[b.id]]
+        global_to_local = {sid: i for i, sid in enumerate(local_to_global)}
+        shard_fixed = [fs._replace(session_idx=global_to_local[fs.session_idx])
+                       for fs in fixed_slots if fs.session_idx in global_to_local]
+        args = ([rooms[i] for i in room_idxs], [faculties[i] for i in faculty_idxs], shard_batches, subjects, utils)
+        shard_hint = [(global_to_local[sid], t, rid, fid) for sid, t, rid, fid in hint
+                      if sid in global_to_local] if hint else None
+        kwargs = dict(solve_kwargs, fixed_slots=shard_fixed, max_classes_per_day=max_classes_per_day, num_variants=num_variants,
+                      profile=per_shard, hint=shard_hint)
+        shards.append((args, kwargs, local_to_global))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(solve_timetables, *args, **kwargs) for args, kwargs, _ in shards]
+        shard_solutions = [future.result() for future in futures]
+
+    if any(not sols for sols in shard_solutions):
+        print("Sharded solve: a component has no feasible solution")
+        return []
+
+    solutions = []
+    for variant in range(max(len(sols) for sols in shard_solutions)):
+        merged = []
+        for sols, (_, _, local_to_global) in zip(shard_solutions, shards):
+            sol = sols[min(variant, len(sols) - 1)]
+            merged.extend((local_to_global[sid], t, rid, fid) for sid, t, rid, fid in sol)
+        merged.sort()
+        solutions.append(merged)
+    return solutions
+
+
+def solve_incremental(rooms, faculties, batches, subjects, utils: TimeTableUtils, previous_solution, changed=None, fixed_slots=None,
+                      max_classes_per_day=4, mode="fix", move_weight=100, weights=None, profile=None):
+    """
+    Repair `previous_solution` after small data edits instead of solving from scratch.
+
+    previous_solution: list of (session_id, timeslot, room_id, faculty_id) from an earlier solve
+    changed: optional dict of changed entity ids, e.g. {"faculties": ["F1"], "rooms": ["R2"]}.
+        Sessions that used a changed room/faculty or belong to a changed batch/subject are
+        re-placed, as is every session whose previous assignment is no longer feasible.
+    mode: "fix" keeps all unaffected sessions exactly where they were and only solves the
+        affected ones, charging `move_weight` per affected session that leaves a still
+        feasible old slot (falls back to "perturbation" if that is infeasible);
+        "perturbation" lets everything move but charges `move_weight` per session that changes.
+
+    The previous assignment is always passed to CP-SAT as a hint. weights overrides
+    DEFAULT_OBJECTIVE_WEIGHTS for the remaining soft terms, profile DEFAULT_SOLVER_PROFILE
+    for every solve attempt.
+    Returns (solution, diff) where diff lists {"session_id", "before", "after"} for moved sessions,
+    or (None, []) if no feasible repair was found.
+    """
+    if mode not in ("fix", "perturbation"):
+        raise ValueError(f"Unknown mode {mode!r}")
+    if fixed_slots is None:
+        fixed_slots = []
+    changed = changed or {}
+    profile = solver_profile(profile)
+
+    sessions = expand_sessions(batches, subjects)
+    room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    fac_available = [set(f.available_times) for f in faculties]
+
+    changed_rooms = set(changed.get("rooms", []))
+    changed_faculties = set(changed.get("faculties", []))
+    changed_batches = set(changed.get("batches", []))
+    changed_subjects = set(changed.get("subjects", []))
+
+    # previous assignment per session as (t, r_idx, f_idx) keys, and which sessions must move
+    previous = {}
+    affected = set()
+    for sid, t, rid, fid in previous_solution:
+        if sid >= len(sessions):
+            continue
+        sess = sessions[sid]
+        r_idx = room_id_to_idx.get(rid)
+        f_idx = faculty_id_to_idx.get(fid)
+        previous[sid] = (sid, t, r_idx, f_idx)
+        still_feasible = (
+            r_idx is not None and f_idx is not None and t < utils.T
+            and r_idx in eligible_room_idxs[sid]
+            and (not eligible_faculty_idxs[sid] or f_idx in eligible_faculty_idxs[sid])
+            and t in fac_available[f_idx]
+        )
+        if (not still_feasible or rid in changed_rooms or fid in changed_faculties
+                or changed_batches.intersection(sess['batch_ids']) or sess['subject_id'] in changed_subjects):
+            affected.add(sid)
+    affected.update(s['id'] for s in sessions if s['id'] not in previous)
+
+    def stay_cost(sids):
+        # one unit per session of `sids` that leaves its previous (t, room, faculty)
+        def cost(assign):
+            kept = [assign[previous[sid]] for sid in sids if sid in previous and previous[sid] in assign]
+            return (len(sids) - sum(kept)) * move_weight
+        return cost
+
+    def attempt(kept_fixed, extra_objective):
+        model, assign = build_timetable_model(sessions, rooms, faculties, batches, subjects, utils,
+                                              fixed_slots=list(fixed_slots) + kept_fixed,
+                                              max_classes_per_day=max_classes_per_day,
+                                              extra_objective=extra_objective, weights=weights)
+        add_solution_hint(model, assign, list(previous.values()))
+
+        solver = cp_model.CpSolver()
+        configure_solver(solver, profile)
+        telemetry = SolveTelemetry() if profile["no_improvement_time"] is not None else None
+        result = run_solver(solver, model, callback=telemetry, no_improvement_time=profile["no_improvement_time"])
+        if result not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            return None
+        return [(ss, tt, rooms[rr].id, faculties[ff].id) for (ss, tt, rr, ff), v in assign.items() if solver.Value(v) == 1]
+
+    fixed_ids = {fs.session_idx for fs in fixed_slots}
+    solution = None
+    if mode == "fix":
+        kept_fixed = [FixedSlot(sid, t, rooms[r_idx].id, faculties[f_idx].id)
+                      for sid, (_, t, r_idx, f_idx) in previous.items()
+                      if sid not in affected and sid not in fixed_ids]
+        try:
+            # affected sessions still prefer their old slot where it remains feasible
+            solution = attempt(kept_fixed, stay_cost(affected))
+        except ValueError:
+            solution = None
+        if solution is None:
+            print("Incremental repair: fixing unaffected sessions is infeasible, retrying with minimal perturbation")
+    if solution is None:
+        solution = attempt([], stay_cost([s['id'] for s in sessions]))
+    if solution is None:
+        print("Incremental repair: No feasible solution found")
+        return None, []
+
+    before = {sid: (t, rid, fid) for sid, t, rid, fid in previous_solution}
+    diff = []
+    for sid, t, rid, fid in sorted(solution):
+        if before.get(sid) != (t, rid, fid):
+            diff.append({"session_id": sid, "before": list(before[sid]) if sid in before else None, "after": [t, rid, fid]})
+    return solution, diff
+
+
+def generate_timetable(data, days=5, periods_per_day=6, num_variants=1, max_classes_per_day=4, formulation="assignment",
+                       progress_callback=None, cancel_event=None, sharded=False, shard_workers=None, engine="cpsat",
+                       weights=None, metrics=None, on_incumbent=None, profile=None, analyze=True):
+    """
+    Entry point used by the web backend. Takes the raw dict payload and returns
+    (solutions, session_map) where session_map maps session_id -> session details.
+    formulation, progress_callback and cancel_event are passed on to solve_timetables.
+    sharded solves independent components separately (see solve_timetables_sharded) on
+    at most shard_workers processes (default: the profile's workers), sharing the profile's
+    workers between them; cancel_event must then be picklable (e.g. a multiprocessing
+    Manager Event).
+    engine: "cpsat", "heuristic" (millisecond constructive heuristic only),
+    "heuristic+cpsat" (heuristic solution used as the CP-SAT hint) or "portfolio" (one
+    timetable from parallel CP-SAT strategies, see portfolio.solve_portfolio; its report
+    goes to metrics["portfolio"]).
+    weights: objective weights overriding DEFAULT_OBJECTIVE_WEIGHTS.
+    metrics, on_incumbent: solver telemetry, see solve_timetables (CP-SAT runs that are not sharded only).
+    profile: solver resource profile overriding DEFAULT_SOLVER_PROFILE.
+    analyze: run feasibility.analyze_instance before building any model, and diagnose a
+    CP-SAT INFEASIBLE result (not sharded); both raise feasibility.InfeasibleInstanceError
+    carrying the report instead of returning no solutions.
+    """
+    if engine not in ("cpsat", "heuristic", "heuristic+cpsat", "portfolio"):
+        raise ValueError(f"Unknown engine {engine!r}")
+    from feasibility import InfeasibleInstanceError, analyze_instance, diagnose_infeasibility
+    from heuristic_engine import solve_heuristic, solve_heuristic_variants
+
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    utils = TimeTableUtils(days=days, periods_per_day=periods_per_day)
+
+    report = None
+    if analyze:
+        report = analyze_instance(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                  max_classes_per_day=max_classes_per_day)
+        if not report["ok"]:
+            raise InfeasibleInstanceError(report)
+        if metrics is None:
+            metrics = {}  # the variant statuses tell an infeasible model from a timeout
+
+    hint = None
+    if engine == "heuristic+cpsat":
+        hint = solve_heuristic(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                               max_classes_per_day=max_classes_per_day)
+
+    if engine == "heuristic":
+        solutions = solve_heuristic_variants(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                             max_classes_per_day=max_classes_per_day, num_variants=num_variants)
+        if progress_callback is not None:
+            progress_callback(len(solutions), num_variants)
+    elif engine == "portfolio":
+        from portfolio import solve_portfolio
+
+        solution, portfolio_report = solve_portfolio(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                                     max_classes_per_day=max_classes_per_day, weights=weights,
+                                                     profile=profile, cancel_event=cancel_event)
+        solutions = [solution] if solution is not None else []
+        if metrics is not None:
+            metrics["portfolio"] = portfolio_report
+        if progress_callback is not None:
+            progress_callback(len(solutions), 1)
+        if analyze and portfolio_report["reason"] == "infeasible":
+            report["diagnosis"] = diagnose_infeasibility(rooms, faculties, batches, subjects, utils,
+                                                         fixed_slots=fixed_slots,
+                                                         max_classes_per_day=max_classes_per_day)
+            raise InfeasibleInstanceError(report)
+    elif sharded:
+        solutions = solve_timetables_sharded(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                             max_classes_per_day=max_classes_per_day, num_variants=num_variants,
+                                             max_workers=shard_workers, formulation=formulation, hint=hint,
+                                             cancel_event=cancel_event, weights=weights, profile=profile)
+        if progress_callback is not None:
+            progress_callback(len(solutions), num_variants)
+    else:
+        solutions = solve_timetables(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                     max_classes_per_day=max_classes_per_day, num_variants=num_variants,
+                                     formulation=formulation, progress_callback=progress_callback,
+                                     cancel_event=cancel_event, hint=hint, weights=weights, metrics=metrics,
+                                     on_incumbent=on_incumbent, profile=profile)
+        if (analyze and not solutions and metrics["variants"] and metrics["variants"][0]["status"] == "INFEASIBLE"
+                and (cancel_event is None or not cancel_event.is_set())):
+            report["diagnosis"] = diagnose_infeasibility(rooms, faculties, batches, subjects, utils,
+                                                         fixed_slots=fixed_slots,
+                                                         max_classes_per_day=max_classes_per_day)
+            raise InfeasibleInstanceError(report)
+
+    # Map session_id -> session details for frontend
+    sessions = expand_sessions(batches, subjects)
+    session_map = {s['id']: s for s in sessions}
+    return solutions, session_map
+
+
+def repair_timetable(data, previous_solution, changed=None, days=5, periods_per_day=6, max_classes_per_day=4, mode="fix",
+                     weights=None, profile=None):
+    """
+    Entry point for incremental re-solves. `data` is the updated raw dict payload,
+    previous_solution the published (session_id, timeslot, room_id, faculty_id) list.
+    Returns (solution, diff, session_map), see solve_incremental.
+    """
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    utils = TimeTableUtils(days=days, periods_per_day=periods_per_day)
+
+    solution, diff = solve_incremental(rooms, faculties, batches, subjects, utils, previous_solution, changed=changed,
+                                       fixed_slots=fixed_slots, max_classes_per_day=max_classes_per_day, mode=mode,
+                                       weights=weights, profile=profile)
+
+    sessions = expand_sessions(batches, subjects)
+    session_map = {s['id']: s for s in sessions}
+    return solution, diff, session_map
+
+
+# ------------------------ Pretty printing / sample data ------------------------
+
+def print_solution(sol, sessions, rooms, faculties, utils):
+    """
+    sol: list of tuples (session_id, timeslot, room_id, faculty_id)
+    sessions: expanded sessions list
+    """
+    # map session->details
+    by_batch = defaultdict(list)
+    for sid, t, rid, fid in sol:
+        sess = sessions[sid]
+        day, period = utils.timeslot_to_day_period(t)
+        for batch_id in sess['batch_ids']:
+            by_batch[batch_id].append((sid, day, period, rid, fid))
+
+    for batch_id, items in by_batch.items():
+        print(f"Batch {batch_id} timetable:")
+        for sid, day, period, rid, fid in sorted(items, key=lambda x: (x[1], x[2])):
+            subj_id = sessions[sid]['subject_id']
+            print(f"  Day {day} Period {period} -> Subject {subj_id}, Room {rid}, Faculty {fid}")
+        print()
+
+
+if __name__ == '__main__':
+    import json
+
+    # Load sample data for demonstration
+    with open(os.path.join(os.path.dirname(__file__), "sample_data.json"), "r") as f:
+        data = json.load(f)
+
+    utils = TimeTableUtils(days=5, periods_per_day=6)  # 30 timeslots
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+
+    # Solve for 2 variants
+    solutions = solve_timetables(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots, max_classes_per_day=3, num_variants=2)
+
+    # Expand sessions used in solver to print nicely
+    sessions = expand_sessions(batches, subjects)
+
+    for i, sol in enumerate(solutions):
+        print("\n=== Solution variant", i, "===")
+        print_solution(sol, sessions, rooms, faculties, utils)
 
-            solutions.append(sol_assignment)
-            forbidden_solutions.append(true_vars)
-
-        return solutions
-
-    # ------------------------ Pretty printing / sample data ------------------------
-
-    def print_solution(sol, sessions, rooms, faculties, utils):
-        """
-        sol: list of tuples (session_id, timeslot, room_id, faculty_id)
-        sessions: expanded sessions list
-        """
-        # map session->details
-        by_batch = defaultdict(list)
-        for sid, t, rid, fid in sol:
-            sess = sessions[sid]
-            day, period = utils.timeslot_to_day_period(t)
-            by_batch[sess['batch_id']].append((sid, day, period, rid, fid))
-
-        for batch_id, items in by_batch.items():
-            print(f"Batch {batch_id} timetable:")
-            for sid, day, period, rid, fid in sorted(items, key=lambda x:(x[1], x[2])):
-                subj_id = sessions[sid]['subject_id']
-                print(f"  Day {day} Period {period} -> Subject {subj_id}, Room {rid}, Faculty {fid}")
-            print()
-
-
-    if __name__ == '__main__':
-        # Create sample data for demonstration
-        utils = TimeTableUtils(days=5, periods_per_day=6)  # 30 timeslots
-
-        #     rooms = data["rooms"]
-    #     faculties = data["faculties"]
-    #     batches = data["batches"]
-    #     subjects = data["subjects"]
-    #     fixed_slots = data["fixed_slots"]
-
-        rooms = data["rooms"]
-        # faculties with availability (all timeslots for simplicity but we can remove some)
-        all_times = list(range(utils.T))
-        faculties = data["faculties"]
-        batches = data["batches"]
-        # subjects: S0,S1,S2 with different hours/week and allowed rooms
-        subjects = data["subjects"]
-
-        # fixed_slots: empty for demo
-        fixed_slots = data["fixed_slots"]
-
-        # Solve for 2 variants
-        solutions = solve_timetables(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots, max_classes_per_day=3, num_variants=2)
-
-        # Expand sessions used in solver to print nicely
-        sessions = expand_sessions(batches, subjects)
-
-        for i, sol in enumerate(solutions):
-            print("\n=== Solution variant", i, "===")
-            print_solution(sol, sessions, rooms, faculties, utils)
-
-        print("Done")
+    print("Done")
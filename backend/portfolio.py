@@ -0,0 +1,179 @@
+"""
+Multi-process portfolio search.
+
+solve_portfolio runs one CP-SAT search per strategy, each in its own process,
+on the same instance. Strategies differ in random seed, search branching,
+linearization level and whether the heuristic engine's solution is used as a
+hint. The processes publish their incumbent objective and bound through a
+multiprocessing Manager; the best incumbent and the best bound across all of
+them decide when to stop: as soon as one search proves optimality, the shared
+gap reaches the target or the caller cancels, every search is stopped. The
+report names the winning strategy so the defaults can be tuned from real runs.
+
+Limitation: only incumbent objectives and bounds are shared, and only to decide
+when to stop. No search is seeded with another's incumbent (as a hint or an
+objective cutoff); each strategy improves its own solutions, and the best one
+across strategies is picked at the end.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ortools.sat.python import cp_model
+
+from optimization_engine import (TimeTableUtils, add_solution_hint, build_timetable_model, configure_solver,
+                                 expand_sessions, run_solver, solver_profile)
+from telemetry import SolveTelemetry, relative_gap
+
+# name, CP-SAT parameters (SatParameters fields) and whether to hint the heuristic solution
+DEFAULT_STRATEGIES = [
+    {"name": "default", "parameters": {}, "hint": False},
+    {"name": "heuristic-hint", "parameters": {"random_seed": 1}, "hint": True},
+    {"name": "fixed-search-lin2", "parameters": {"random_seed": 2, "search_branching": "FIXED_SEARCH",
+                                                 "linearization_level": 2}, "hint": True},
+    {"name": "pseudo-cost-lin0", "parameters": {"random_seed": 3, "search_branching": "PSEUDO_COST_SEARCH",
+                                                "linearization_level": 0}, "hint": False},
+    {"name": "quick-restart-lin1", "parameters": {"random_seed": 4,
+                                                  "search_branching": "PORTFOLIO_WITH_QUICK_RESTART_SEARCH",
+                                                  "linearization_level": 1}, "hint": False},
+]
+
+
+def apply_parameters(solver, parameters):
+    """Set SatParameters fields given as a dict, e.g. {"search_branching": "FIXED_SEARCH"}."""
+    if parameters:
+        solver.parameters.merge_text_format(" ".join(f"{k}: {v}" for k, v in parameters.items()))
+
+
+def _run_strategy(strategy, instance, utils, max_classes_per_day, weights, profile, shared, lock, stop_event):
+    """
+    Worker process: solve with one strategy, publish incumbents/bounds, return its result.
+    The search never reads other strategies' incumbents, see the module docstring.
+    """
+    rooms, faculties, batches, subjects, fixed_slots = instance
+    name = strategy["name"]
+    sessions = expand_sessions(batches, subjects)
+    model, assign = build_timetable_model(sessions, rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                                          max_classes_per_day=max_classes_per_day, weights=weights)
+    if strategy.get("hint"):
+        from heuristic_engine import solve_heuristic
+
+        hint = solve_heuristic(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                               max_classes_per_day=max_classes_per_day)
+        if hint:
+            room_id_to_idx = {r.id: i for i, r in enumerate(rooms)}
+            faculty_id_to_idx = {f.id: i for i, f in enumerate(faculties)}
+            add_solution_hint(model, assign, [(sid, t, room_id_to_idx[rid], faculty_id_to_idx[fid])
+                                              for sid, t, rid, fid in hint])
+
+    solver = cp_model.CpSolver()
+    configure_solver(solver, profile)
+    apply_parameters(solver, strategy.get("parameters"))
+
+    def publish(objective=None, bound=None):
+        # Manager dict proxies only see assignments, so entries are replaced, never mutated
+        with lock:
+            entry = dict(shared[name])
+            if objective is not None and (entry["objective"] is None or objective < entry["objective"]):
+                entry["objective"] = objective
+                entry["found_at"] = time.time()  # comparable across processes
+            if bound is not None and (entry["best_bound"] is None or bound > entry["best_bound"]):
+                entry["best_bound"] = bound
+            shared[name] = entry
+
+    telemetry = SolveTelemetry(on_incumbent=lambda info, _: publish(info["objective"], info["best_bound"]))
+    solver.best_bound_callback = lambda bound: publish(bound=bound)
+    status = run_solver(solver, model, stop_event, telemetry, profile["no_improvement_time"])
+
+    solution = None
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        solution = sorted((sid, t, rooms[r].id, faculties[f].id) for (sid, t, r, f), v in assign.items()
+                          if solver.Value(v))
+        publish(solver.ObjectiveValue(), solver.BestObjectiveBound())
+    if status == cp_model.OPTIMAL:
+        with lock:
+            entry = dict(shared[name])
+            entry["optimal"] = True
+            shared[name] = entry
+    summary = telemetry.summary(solver, status)
+    summary.pop("trajectory")
+    return dict(summary, name=name, parameters=strategy.get("parameters", {}), hint=bool(strategy.get("hint")),
+                solution=solution)
+
+
+def solve_portfolio(rooms, faculties, batches, subjects, utils: TimeTableUtils, fixed_slots=None, max_classes_per_day=4,
+                    strategies=None, target_gap=None, weights=None, profile=None, cancel_event=None):
+    """
+    Solve one timetable with the strategies (default DEFAULT_STRATEGIES) in parallel.
+
+    Only the first strategies run, one process each and no more than the profile's
+    workers; those workers are split evenly between them. The profile's max_time
+    (or total_time) bounds the whole portfolio. target_gap (default the profile's
+    relative_gap) stops all searches once the best incumbent of any of them is within
+    that relative gap of the best bound of any of them.
+
+    Returns (solution, report). solution is the best (session_id, timeslot, room_id,
+    faculty_id) list found, or None; report has "winner" (strategy name or None), "reason"
+    (optimal, target_gap, time_limit, cancelled or infeasible), "objective",
+    "best_bound", "gap", "elapsed" and one entry per strategy.
+    """
+    start = time.perf_counter()
+    profile = solver_profile(profile)
+    # one process per strategy: never more than the job's worker budget
+    strategies = (strategies or DEFAULT_STRATEGIES)[:profile["workers"]]
+    if target_gap is None:
+        target_gap = profile["relative_gap"]
+    time_limit = profile["total_time"] if profile["total_time"] is not None else profile["max_time"]
+    per_strategy = dict(profile, workers=max(1, profile["workers"] // len(strategies)), max_time=time_limit)
+    instance = (rooms, faculties, batches, subjects, fixed_slots or [])
+
+    with multiprocessing.Manager() as manager:
+        shared = manager.dict({s["name"]: {"objective": None, "best_bound": None, "found_at": None, "optimal": False}
+                               for s in strategies})
+        lock = manager.Lock()
+        stop_event = manager.Event()
+        reason = None
+        with ProcessPoolExecutor(max_workers=len(strategies)) as pool:
+            futures = [pool.submit(_run_strategy, strategy, instance, utils, max_classes_per_day, weights, per_strategy,
+                                   shared, lock, stop_event) for strategy in strategies]
+            while not all(f.done() for f in futures):
+                time.sleep(0.1)
+                if reason is not None:
+                    continue
+                entries = dict(shared)
+                objectives = [e["objective"] for e in entries.values() if e["objective"] is not None]
+                bounds = [e["best_bound"] for e in entries.values() if e["best_bound"] is not None]
+                if any(e["optimal"] for e in entries.values()):
+                    reason = "optimal"
+                elif target_gap is not None and objectives and bounds and \
+                        relative_gap(min(objectives), max(bounds)) <= target_gap:
+                    reason = "target_gap"
+                elif cancel_event is not None and cancel_event.is_set():
+                    reason = "cancelled"
+                if reason is not None:
+                    stop_event.set()
+            results = [f.result() for f in futures]
+            entries = dict(shared)
+
+    # Winner: the best objective; ties go to whoever found it first
+    found = [r for r in results if r["solution"] is not None]
+    winner = min(found, key=lambda r: (r["objective"], entries[r["name"]]["found_at"])) if found else None
+    if reason is None:
+        if any(r["status"] == "OPTIMAL" for r in results):
+            reason = "optimal"
+        elif any(r["status"] == "INFEASIBLE" for r in results):
+            reason = "infeasible"
+        else:
+            reason = "time_limit"
+    bounds = [r["best_bound"] for r in results if r["best_bound"] is not None]
+    bound = max(bounds) if bounds else None
+    report = {
+        "winner": winner["name"] if winner else None,
+        "reason": reason,
+        "objective": winner["objective"] if winner else None,
+        "best_bound": bound,
+        "gap": relative_gap(winner["objective"], bound) if winner else None,
+        "elapsed": time.perf_counter() - start,
+        "strategies": [{k: v for k, v in r.items() if k != "solution"} for r in results],
+    }
+    return (winner["solution"] if winner else None), report
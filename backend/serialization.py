@@ -0,0 +1,150 @@
+"""
+Compact, streamed encoding of generated timetables.
+
+The default /api/generate payload repeats every session's batch size, allowed
+rooms and eligible faculties and spells out every id in every assignment. The
+compact format interns ids into tables, emits batch and subject metadata once and
+stores each variant as parallel integer columns:
+
+    {"format": "compact-v1",
+     "rooms": [...], "faculties": [...],               # id tables
+     "batches": {"id": [...], "size": [...]},
+     "subjects": {"id": [...], "allowed_rooms": [[room idx]], "eligible_faculties": [[faculty idx]]},
+     "sessions": {"batch": [batch idx per session id], "subject": [subject idx per session id]},
+     "solutions": [{"session": [...], "timeslot": [...], "room": [...], "faculty": [...]}],
+     ...extra top-level fields}
+
+batches.size holds the batch records' sizes (None where unknown). If any session's size
+differs from its batch's (combined or split classes, a curriculum size override),
+"sessions" also has "size" (students per session); for combined classes it has
+"batches" (every attending batch idx per session).
+
+`stream_compact` yields the document in chunks (one solution at a time) as JSON
+or msgpack (needs the optional `msgpack` package), optionally gzip-compressed.
+"""
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for encoding="msgpack"
+    msgpack = None
+
+
+def compact_parts(solutions, session_map, extra=None, batch_sizes=None):
+    """
+    The compact document as a generator of (key, value) pairs in output order.
+    batch_sizes: {batch_id: size} of the batch records; without it every session's size is written.
+    """
+    batch_sizes = batch_sizes or {}
+    room_ids, faculty_ids = [], []
+    room_idx, faculty_idx = {}, {}
+
+    def intern(table, index, value):
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+        return index[value]
+
+    batch_ids_table = []
+    subjects = {"id": [], "allowed_rooms": [], "eligible_faculties": []}
+    batch_idx, subject_idx = {}, {}
+    session_batch, session_subject, session_size, session_batches = [], [], [], []
+    for sid in sorted(session_map):
+        sess = session_map[sid]
+        batch_ids = sess.get("batch_ids") or [sess["batch_id"]]
+        owner = intern(batch_ids_table, batch_idx, sess["batch_id"])
+        if sess["subject_id"] not in subject_idx:
+            intern(subjects["id"], subject_idx, sess["subject_id"])
+            subjects["allowed_rooms"].append([intern(room_ids, room_idx, r) for r in sess["allowed_rooms"] or []])
+            subjects["eligible_faculties"].append([intern(faculty_ids, faculty_idx, f)
+                                                   for f in sess["eligible_faculties"] or []])
+        session_batch.append(owner)
+        session_subject.append(subject_idx[sess["subject_id"]])
+        session_size.append(sess["size"])
+        session_batches.append([intern(batch_ids_table, batch_idx, b) for b in batch_ids])
+    batches = {"id": batch_ids_table, "size": [batch_sizes.get(b) for b in batch_ids_table]}
+    sessions = {"batch": session_batch, "subject": session_subject}
+    if any(size != batches["size"][owner] for owner, size in zip(session_batch, session_size)):
+        sessions["size"] = session_size
+    if any(len(b) > 1 for b in session_batches):
+        sessions["batches"] = session_batches
+
+    columns = []
+    for solution in solutions:
+        ordered = sorted(solution)
+        columns.append({
+            "session": [a[0] for a in ordered],
+            "timeslot": [a[1] for a in ordered],
+            "room": [intern(room_ids, room_idx, a[2]) for a in ordered],
+            "faculty": [intern(faculty_ids, faculty_idx, a[3]) for a in ordered],
+        })
+
+    yield "format", "compact-v1"
+    for key, value in (extra or {}).items():
+        yield key, value
+    yield "rooms", room_ids
+    yield "faculties", faculty_ids
+    yield "batches", batches
+    yield "subjects", subjects
+    yield "sessions", sessions
+    yield "solutions", columns
+
+
+def compact_payload(solutions, session_map, extra=None, batch_sizes=None):
+    """The compact document as one dict."""
+    return dict(compact_parts(solutions, session_map, extra, batch_sizes))
+
+
+def _json_chunks(parts):
+    yield b"{"
+    for i, (key, value) in enumerate(parts):
+        if key == "solutions":
+            # one chunk per variant so the biggest part is never encoded in one piece
+            yield (',' if i else '').encode() + json.dumps(key).encode() + b":["
+            for j, solution in enumerate(value):
+                yield (b"," if j else b"") + json.dumps(solution, separators=(",", ":")).encode()
+            yield b"]"
+        else:
+            yield ((',' if i else '') + json.dumps(key) + ":" + json.dumps(value, separators=(",", ":"))).encode()
+    yield b"}"
+
+
+def _msgpack_chunks(parts):
+    parts = list(parts)
+    packer = msgpack.Packer()
+    yield packer.pack_map_header(len(parts))
+    for key, value in parts:
+        yield packer.pack(key)
+        if key == "solutions":
+            yield packer.pack_array_header(len(value))
+            for solution in value:
+                yield packer.pack(solution)
+        else:
+            yield packer.pack(value)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_compact(solutions, session_map, extra=None, encoding="json", gzip=False, batch_sizes=None):
+    """
+    Generator of byte chunks of the compact document. encoding is "json" or "msgpack";
+    gzip wraps the stream in gzip; batch_sizes as in compact_parts. Raises ValueError for
+    an unknown or unavailable encoding.
+    """
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack encoding needs the msgpack package")
+        chunks = _msgpack_chunks(compact_parts(solutions, session_map, extra, batch_sizes))
+    elif encoding == "json":
+        chunks = _json_chunks(compact_parts(solutions, session_map, extra, batch_sizes))
+    else:
+        raise ValueError(f"Unknown encoding {encoding!r}")
+    return _gzip(chunks) if gzip else chunks
@@ -0,0 +1,246 @@
+"""
+Database-backed data store.
+
+Reads the instance for the engine with one column-projected query per table
+(no ORM objects are built), bulk-imports rooms/faculties/batches/subjects/
+curriculum/fixed slots from JSON or CSV in chunks, and persists generated timetables one row per
+scheduled session so views by batch, faculty or room are index lookups.
+
+All functions use the Flask-SQLAlchemy session (`db.session`) and need an app
+context. Works on Postgres and SQLite.
+"""
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+
+from models import Batch, Curriculum, FixedSlot, Faculty, Room, Subject, Timetable, TimetableEntry, db
+
+ENTITY_MODELS = {
+    "rooms": Room,
+    "faculties": Faculty,
+    "batches": Batch,
+    "subjects": Subject,
+    "curriculum": Curriculum,
+    "fixed_slots": FixedSlot,
+}
+# Columns handed to the engine, in load_instance's field names
+ENTITY_COLUMNS = {
+    "rooms": ("id", "name", "capacity", "type"),
+    "faculties": ("id", "name", "subjects", "available_times"),
+    "batches": ("id", "name", "size"),
+    "subjects": ("id", "name", "hours_per_week", "allowed_rooms", "eligible_faculties"),
+    "curriculum": ("batch_id", "subject_id", "hours_per_week", "sections", "elective_group", "combined_with", "size"),
+    "fixed_slots": ("session_idx", "timeslot", "room", "faculty"),
+}
+# Columns identifying a row; an imported row replaces the stored row with the same key.
+# A session has at most one fixed slot, so re-importing fixed slots replaces them.
+ENTITY_KEYS = {"rooms": ("id",), "faculties": ("id",), "batches": ("id",), "subjects": ("id",),
+               "curriculum": ("batch_id", "subject_id"), "fixed_slots": ("session_idx",)}
+INT_COLUMNS = {"capacity", "size", "hours_per_week", "sections", "session_idx", "timeslot"}
+LIST_COLUMNS = {"subjects": str, "available_times": int, "allowed_rooms": str, "eligible_faculties": str,
+                "combined_with": str}
+# batch and subject order determines session ids
+ORDERED = ("batches", "subjects")
+
+
+def load_data():
+    """The stored instance as the raw dict payload generate_timetable takes."""
+    data = {}
+    for kind, model in ENTITY_MODELS.items():
+        columns = [getattr(model, c) for c in ENTITY_COLUMNS[kind]]
+        keys = ENTITY_KEYS[kind]
+        order = (model.position, model.id) if kind in ORDERED else tuple(getattr(model, k) for k in keys)
+        rows = db.session.execute(select(*columns).order_by(*order)).mappings()
+        data[kind] = [dict(row) for row in rows]
+    return data
+
+
+def has_data():
+    return db.session.execute(select(func.count()).select_from(Batch)).scalar() > 0
+
+
+def normalize_row(kind, row):
+    """Coerce one imported row (JSON or CSV strings) to the column types of `kind`."""
+    out = {}
+    for column in ENTITY_COLUMNS[kind]:
+        value = row.get(column)
+        if value == "":
+            value = None
+        if column in LIST_COLUMNS:
+            if isinstance(value, str):
+                # CSV list cells are ";" separated, e.g. "S1;S2"
+                value = [v.strip() for v in value.split(";") if v.strip()]
+            value = [LIST_COLUMNS[column](v) for v in value or []]
+        elif column in INT_COLUMNS and value is not None:
+            value = int(value)
+        out[column] = value
+    if out.get("name") is None and "name" in out:
+        out["name"] = out["id"]
+    if kind == "curriculum" and out["sections"] is None:
+        out["sections"] = 1
+    return out
+
+
+def import_records(kind, rows, replace=False, chunk_size=1000):
+    """
+    Bulk insert `rows` (dicts) of one entity kind. Rows whose key (ENTITY_KEYS, usually the
+    id) already exists replace the stored row (keeping its position); with replace=True the
+    table is emptied first.
+    Executes multi-row INSERTs of `chunk_size` rows; the caller commits.
+    Returns the number of rows written.
+    """
+    if kind not in ENTITY_MODELS:
+        raise ValueError(f"Unknown entity kind {kind!r}")
+    model = ENTITY_MODELS[kind]
+    rows = [normalize_row(kind, row) for row in rows]
+    keys = ENTITY_KEYS[kind]
+    rows = list({tuple(row[k] for k in keys): row for row in rows}.values())  # last duplicate wins
+
+    if replace:
+        db.session.execute(delete(model))
+    else:
+        if len(keys) == 1:
+            key_column, ids = getattr(model, keys[0]), [row[keys[0]] for row in rows]
+        else:
+            key_column = tuple_(*(getattr(model, k) for k in keys))
+            ids = [tuple(row[k] for k in keys) for row in rows]
+        positions = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            if kind in ORDERED:
+                positions.update(db.session.execute(select(model.id, model.position).where(model.id.in_(chunk))).all())
+            db.session.execute(delete(model).where(key_column.in_(chunk)))
+
+    if kind in ORDERED:
+        next_position = 0 if replace else db.session.execute(select(func.coalesce(func.max(model.position), -1))).scalar() + 1
+        for row in rows:
+            if not replace and row["id"] in positions:
+                row["position"] = positions[row["id"]]
+            else:
+                row["position"] = next_position
+                next_position += 1
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if chunk:
+            db.session.execute(insert(model), chunk)
+    return len(rows)
+
+
+def import_data(data, replace=False, chunk_size=1000):
+    """
+    Import a raw dict payload (any subset of rooms, faculties, batches, subjects,
+    curriculum, fixed_slots) in one transaction. replace=True empties every table the
+    payload names first; replacing the batches also drops the curriculum unless the
+    payload brings a new one. Returns {kind: rows written}.
+    """
+    counts = {}
+    try:
+        if replace and "batches" in data and "curriculum" not in data:
+            db.session.execute(delete(Curriculum))
+        for kind in ENTITY_MODELS:
+            if kind in data:
+                counts[kind] = import_records(kind, data[kind], replace=replace, chunk_size=chunk_size)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
+
+
+def parse_import_file(filename, content, kind=None):
+    """
+    Parse an uploaded file into a raw dict payload. JSON files hold either a payload
+    dict or a list of rows of `kind`; CSV files hold rows of `kind` (default: the file
+    name, e.g. rooms.csv) with a header line and ";" separated list cells.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    stem, ext = os.path.splitext(os.path.basename(filename or ""))
+    kind = kind or stem
+    if ext.lower() == ".json":
+        parsed = json.loads(content)
+        if isinstance(parsed, dict):
+            return parsed
+        rows = parsed
+    elif ext.lower() == ".csv":
+        rows = list(csv.DictReader(io.StringIO(content)))
+    else:
+        raise ValueError(f"Unsupported file type {ext!r}, expected .json or .csv")
+    if kind not in ENTITY_MODELS:
+        raise ValueError(f"Unknown entity kind {kind!r}")
+    return {kind: rows}
+
+
+def save_timetable(solutions, session_map, days, periods_per_day, fingerprint=None, reuse=False, room_ids=None,
+                   chunk_size=5000):
+    """
+    Persist generated variants under `fingerprint` (see cache.instance_fingerprint), if given.
+    room_ids: every room of the instance, kept with the timetable for its free-room view.
+    reuse=True says the solutions are the ones stored for that fingerprint (a cache hit): the
+    stored timetable id is returned instead of writing a copy, if there is one. Otherwise a
+    new timetable is written and takes the fingerprint over from older ones, which stay
+    readable by id. Returns the timetable id.
+    """
+    if fingerprint is not None and reuse:
+        existing = db.session.execute(select(Timetable.id).where(Timetable.fingerprint == fingerprint)
+                                      .order_by(Timetable.id.desc())).scalar()
+        if existing is not None:
+            return existing
+    try:
+        if fingerprint is not None:
+            db.session.execute(update(Timetable).where(Timetable.fingerprint == fingerprint).values(fingerprint=None))
+        timetable = Timetable(fingerprint=fingerprint, days=days, periods_per_day=periods_per_day,
+                              num_variants=len(solutions), room_ids=sorted(room_ids) if room_ids is not None else None)
+        db.session.add(timetable)
+        db.session.flush()
+        timetable_id = timetable.id
+        rows = []
+        for variant, solution in enumerate(solutions):
+            for sid, t, room_id, faculty_id in solution:
+                sess = session_map[sid]
+                # a combined class gets one row per attending batch so every batch view has it
+                for batch_id in sess.get("batch_ids") or [sess["batch_id"]]:
+                    rows.append({"timetable_id": timetable_id, "variant": variant, "session_id": sid,
+                                 "batch_id": batch_id, "subject_id": sess["subject_id"], "timeslot": t,
+                                 "day": t // periods_per_day, "period": t % periods_per_day,
+                                 "room_id": room_id, "faculty_id": faculty_id})
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(insert(TimetableEntry), rows[start:start + chunk_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return timetable_id
+
+
+def timetable_info(timetable_id):
+    """
+    days, periods_per_day, num_variants and room_ids (None if not recorded) of a stored
+    timetable, or None if unknown.
+    """
+    row = db.session.execute(select(Timetable.days, Timetable.periods_per_day, Timetable.num_variants,
+                                    Timetable.room_ids)
+                             .where(Timetable.id == timetable_id)).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def room_ids():
+    return list(db.session.execute(select(Room.id).order_by(Room.id)).scalars())
+
+
+ENTRY_COLUMNS = ("session_id", "batch_id", "subject_id", "timeslot", "day", "period", "room_id", "faculty_id")
+
+
+def timetable_entries(timetable_id, variant=0, batch_id=None, faculty_id=None, room_id=None, timeslot=None):
+    """Entries of one stored variant as dicts ordered by timeslot, optionally filtered by entity."""
+    query = select(*(getattr(TimetableEntry, c) for c in ENTRY_COLUMNS)).where(
+        TimetableEntry.timetable_id == timetable_id, TimetableEntry.variant == variant)
+    for column, value in (("batch_id", batch_id), ("faculty_id", faculty_id), ("room_id", room_id), ("timeslot", timeslot)):
+        if value is not None:
+            query = query.where(getattr(TimetableEntry, column) == value)
+    rows = db.session.execute(query.order_by(TimetableEntry.timeslot, TimetableEntry.session_id)).mappings()
+    return [dict(row) for row in rows]
@@ -0,0 +1,89 @@
+"""
+Solver telemetry for CP-SAT runs.
+
+SolveTelemetry is a solution callback that records the objective/bound
+trajectory, time to first solution, branches and conflicts, and (through the
+solver log) how long presolve took. It can also hand every incumbent to a
+listener so clients can watch, and accept, intermediate timetables.
+"""
+import time
+
+from ortools.sat.python import cp_model
+
+
+def relative_gap(objective, bound):
+    """|objective - bound| / max(1, |objective|), the same normalisation CP-SAT uses."""
+    if objective is None or bound is None:
+        return None
+    return abs(objective - bound) / max(1.0, abs(objective))
+
+
+class SolveTelemetry(cp_model.CpSolverSolutionCallback):
+    """
+    Attach with `telemetry.attach(solver)` before solving and pass the instance as the
+    solve callback; read `summary(solver, status)` afterwards.
+
+    extract: optional callable(callback) -> solution, used to materialize an incumbent
+    on_incumbent: optional callable(info, solution) called for every improving solution;
+        info holds wall_time, objective, best_bound, gap, num_branches, num_conflicts.
+        solution() runs `extract` on the incumbent (None without extract) and is only
+        valid during the call; extracting reads every variable, so listeners should
+        only ask for the solutions they actually use.
+    """
+
+    def __init__(self, extract=None, on_incumbent=None):
+        super().__init__()
+        self.extract = extract
+        self.on_incumbent = on_incumbent
+        self.start = None
+        self.presolve_time = None
+        self.time_to_first_solution = None
+        self.last_improvement = None  # perf_counter() of the latest solution
+        self.trajectory = []
+
+    def attach(self, solver):
+        # Presolve ends when CP-SAT logs the presolved model; the log goes to us, not stdout
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self._on_log
+        self.start = time.perf_counter()
+
+    def _on_log(self, line):
+        if self.presolve_time is None and line.startswith("Presolved"):
+            self.presolve_time = time.perf_counter() - self.start
+
+    def on_solution_callback(self):
+        self.last_improvement = time.perf_counter()
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        info = {
+            "wall_time": self.WallTime(),
+            "objective": objective,
+            "best_bound": bound,
+            "gap": relative_gap(objective, bound),
+            "num_branches": self.NumBranches(),
+            "num_conflicts": self.NumConflicts(),
+        }
+        if self.time_to_first_solution is None:
+            self.time_to_first_solution = info["wall_time"]
+        self.trajectory.append(info)
+        if self.on_incumbent is not None:
+            self.on_incumbent(info, lambda: self.extract(self) if self.extract is not None else None)
+
+    def summary(self, solver, status):
+        """Metrics for one finished solve."""
+        found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        objective = solver.ObjectiveValue() if found else None
+        bound = solver.BestObjectiveBound() if found else None
+        return {
+            "status": solver.StatusName(status),
+            "wall_time": solver.WallTime(),
+            "presolve_time": self.presolve_time,
+            "time_to_first_solution": self.time_to_first_solution,
+            "objective": objective,
+            "best_bound": bound,
+            "gap": relative_gap(objective, bound),
+            "num_branches": solver.NumBranches(),
+            "num_conflicts": solver.NumConflicts(),
+            "trajectory": [(p["wall_time"], p["objective"], p["best_bound"]) for p in self.trajectory],
+        }
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The app reads its configuration at import: in-memory database, no job lock file
+os.environ["TIMETABLE_DATABASE_URI"] = "sqlite://"
+os.environ["TIMETABLE_JOB_LOCK_FILE"] = ""
+os.environ.pop("TIMETABLE_CACHE_DIR", None)
+
+
+@pytest.fixture
+def client():
+    """Test client of the app on an empty database, with empty caches."""
+    import app as timetable_app
+    from models import db
+
+    with timetable_app.app.app_context():
+        db.drop_all()
+        db.create_all()
+    timetable_app.result_cache.clear()
+    timetable_app.view_cache.clear()
+    yield timetable_app.app.test_client()
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.mark.parametrize("endpoint", ["/api/generate", "/api/jobs", "/api/analyze"])
+@pytest.mark.parametrize("payload, error", [
+    ({"num_variants": "x"}, "num_variants must be an integer"),
+    ({"days": 2.5}, "days must be an integer"),
+    ({"periods_per_day": 0}, "periods_per_day must be at least 1"),
+    ({"max_classes_per_day": None}, "max_classes_per_day must be an integer"),
+    ({"solver": {"workers": "many"}}, "solver.workers must be an integer"),
+])
+def test_invalid_generation_settings_are_rejected(client, endpoint, payload, error):
+    client.post("/api/sample-data/load")
+    response = client.post(endpoint, json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+def test_numeric_strings_are_accepted():
+    import app as timetable_app
+
+    params = timetable_app.generation_params({"days": "3", "num_variants": 2.0})
+    assert (params["days"], params["periods_per_day"], params["num_variants"]) == (3, 6, 2)
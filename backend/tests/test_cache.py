@@ -0,0 +1,25 @@
+import os
+
+from cache import ResultCache
+
+
+def test_persisted_entries_survive_restart(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put("k", [[(0, 1, "R0", "F0")]], {0: {"batch_id": "B0"}})
+    assert ResultCache(directory=str(tmp_path)).get("k") == ([[(0, 1, "R0", "F0")]], {0: {"batch_id": "B0"}})
+    assert [p.name for p in tmp_path.iterdir()] == ["k.json"]
+
+
+def test_corrupt_files_are_skipped_on_load(tmp_path):
+    (tmp_path / "bad.json").write_text('{"solutions": [[0, 1')
+    (tmp_path / "odd.json").write_text('[1, 2]')
+    cache = ResultCache(directory=str(tmp_path))
+    assert cache.stats()["size"] == 0
+
+
+def test_get_tolerates_file_evicted_by_another_process(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put("k", [], {})
+    os.remove(tmp_path / "k.json")
+    assert cache.get("k") == ([], {})
+    cache.clear()
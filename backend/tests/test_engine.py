@@ -0,0 +1,119 @@
+import pytest
+
+from optimization_engine import TimeTableUtils, expand_sessions, load_instance, solve_timetables
+
+
+def sections_instance():
+    return {
+        "rooms": [{"id": "R0", "capacity": 30}, {"id": "R1", "capacity": 30}],
+        "faculties": [{"id": "F0", "available_times": [0, 1]}, {"id": "F1", "available_times": [0, 1]}],
+        "batches": [{"id": "B0", "size": 40}],
+        "subjects": [{"id": "S1", "hours_per_week": 1}],
+        "curriculum": [{"batch_id": "B0", "subject_id": "S1", "sections": 2}],
+    }
+
+
+@pytest.mark.parametrize("reuse_model", [True, False])
+def test_variants_with_parallel_sections(reuse_model):
+    rooms, faculties, batches, subjects, _ = load_instance(sections_instance())
+    sessions = expand_sessions(batches, subjects)
+    solutions = solve_timetables(rooms, faculties, batches, subjects, TimeTableUtils(days=1, periods_per_day=2),
+                                 num_variants=3, reuse_model=reuse_model, profile={"max_time": 10, "workers": 1})
+    # both sections at period 0, both at period 1, or one in each
+    patterns = {frozenset((sessions[sid]['subject_id'], t) for sid, t, _, _ in sol) for sol in solutions}
+    assert len(solutions) == 3
+    assert patterns == {frozenset({("S1", 0)}), frozenset({("S1", 1)}), frozenset({("S1", 0), ("S1", 1)})}
+
+
+def test_chained_combined_classes_are_merged():
+    rooms, faculties, batches, subjects, _ = load_instance({
+        "batches": [{"id": b, "size": 10} for b in ("B1", "B2", "B3")],
+        "subjects": [{"id": "S", "hours_per_week": 1}],
+        "curriculum": [{"batch_id": "B1", "subject_id": "S", "combined_with": ["B2"]},
+                       {"batch_id": "B2", "subject_id": "S"},
+                       {"batch_id": "B3", "subject_id": "S", "combined_with": ["B2"]}],
+    })
+    sessions = expand_sessions(batches, subjects)
+    assert [(s["batch_ids"], s["size"]) for s in sessions] == [(["B1", "B2", "B3"], 30)]
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    """Run shards in this process; returns the recorded pool sizes and shard kwargs."""
+    import optimization_engine
+    from concurrent.futures import Future
+
+    calls = []
+
+    class InlineExecutor:
+        def __init__(self, max_workers):
+            calls.append(("pool", max_workers))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args, **kwargs):
+            calls.append(("shard", kwargs))
+            future = Future()
+            future.set_result(fn(*args, **kwargs))
+            return future
+
+    monkeypatch.setattr(optimization_engine, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(optimization_engine.os, "cpu_count", lambda: 8)
+    return calls
+
+
+def two_components():
+    # two batches with their own room and faculty each: two components
+    return load_instance({
+        "rooms": [{"id": "R0", "capacity": 30}, {"id": "R1", "capacity": 30}],
+        "faculties": [{"id": "F0", "available_times": [0, 1]}, {"id": "F1", "available_times": [0, 1]}],
+        "batches": [{"id": "B0", "size": 20}, {"id": "B1", "size": 20}],
+        "subjects": [{"id": "S0", "hours_per_week": 1, "allowed_rooms": ["R0"], "eligible_faculties": ["F0"]},
+                     {"id": "S1", "hours_per_week": 1, "allowed_rooms": ["R1"], "eligible_faculties": ["F1"]}],
+        "curriculum": [{"batch_id": "B0", "subject_id": "S0"}, {"batch_id": "B1", "subject_id": "S1"}],
+    })[:4]
+
+
+def test_sharded_solve_splits_the_worker_budget(inline_pool):
+    from optimization_engine import solve_timetables_sharded
+
+    solutions = solve_timetables_sharded(*two_components(), TimeTableUtils(days=1, periods_per_day=2), num_variants=1,
+                                         profile={"max_time": 10, "workers": 6})
+    assert len(solutions) == 1 and len(solutions[0]) == 2
+    assert [(kind, arg if kind == "pool" else arg["profile"]["workers"]) for kind, arg in inline_pool] == \
+        [("pool", 2), ("shard", 3), ("shard", 3)]
+
+
+def test_sharded_solve_maps_the_hint_to_each_shard(inline_pool):
+    from optimization_engine import solve_timetables_sharded
+
+    # global session 1 (B1) is the first session of the second shard
+    hint = [(0, 1, "R0", "F0"), (1, 0, "R1", "F1")]
+    solutions = solve_timetables_sharded(*two_components(), TimeTableUtils(days=1, periods_per_day=2), num_variants=1,
+                                         hint=hint, profile={"max_time": 10, "workers": 2})
+    assert [arg["hint"] for kind, arg in inline_pool if kind == "shard"] == [[(0, 1, "R0", "F0")], [(0, 0, "R1", "F1")]]
+    assert len(solutions) == 1 and len(solutions[0]) == 2
+
+
+def test_fix_mode_keeps_affected_sessions_that_can_stay():
+    from instance_generator import generate_instance
+    from optimization_engine import repair_timetable
+
+    data = generate_instance(num_batches=2, num_subjects=3, num_rooms=3, num_faculties=3, seed=1)
+    rooms, faculties, batches, subjects, fixed_slots = load_instance(data)
+    profile = {"max_time": 10, "workers": 2}
+    solution = solve_timetables(rooms, faculties, batches, subjects, TimeTableUtils(days=5, periods_per_day=6),
+                                fixed_slots=fixed_slots, max_classes_per_day=6, num_variants=1, profile=profile)[0]
+    # the faculty of one session loses that session's timeslot; its other classes may stay
+    sid, t, _, faculty_id = solution[0]
+    assert sum(1 for a in solution if a[3] == faculty_id) > 1
+    for faculty in data["faculties"]:
+        if faculty["id"] == faculty_id:
+            faculty["available_times"] = [x for x in faculty["available_times"] if x != t]
+    repaired, diff, _ = repair_timetable(data, solution, changed={"faculties": [faculty_id]}, max_classes_per_day=6,
+                                         mode="fix", profile=profile)
+    assert [d["session_id"] for d in diff] == [sid]
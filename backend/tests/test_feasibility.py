@@ -0,0 +1,65 @@
+from feasibility import analyze_instance, diagnose_infeasibility
+from optimization_engine import TimeTableUtils, load_instance
+
+
+def instance(hours=2, fixed_slots=()):
+    return load_instance({
+        "rooms": [{"id": "R0", "capacity": 40}, {"id": "R1", "capacity": 40}],
+        "faculties": [{"id": "F0", "available_times": list(range(12))},
+                      {"id": "F1", "available_times": list(range(12))}],
+        "batches": [{"id": "B0", "size": 30}, {"id": "B1", "size": 30}],
+        "subjects": [{"id": "S0", "hours_per_week": hours}],
+        "fixed_slots": list(fixed_slots),
+    })
+
+
+def test_feasible_instance_is_ok():
+    rooms, faculties, batches, subjects, fixed_slots = instance()
+    report = analyze_instance(rooms, faculties, batches, subjects, TimeTableUtils(days=2, periods_per_day=6),
+                              fixed_slots=fixed_slots, max_classes_per_day=4)
+    assert report["ok"] and report["issues"] == []
+    assert {b["id"]: (b["demand"], b["supply"]) for b in report["batches"]} == {"B0": (2, 8), "B1": (2, 8)}
+
+
+def test_over_demanded_batch_is_reported():
+    rooms, faculties, batches, subjects, fixed_slots = instance(hours=9)
+    report = analyze_instance(rooms, faculties, batches, subjects, TimeTableUtils(days=2, periods_per_day=6),
+                              fixed_slots=fixed_slots, max_classes_per_day=4)
+    assert not report["ok"]
+    batch_issues = [i for i in report["issues"] if i["constraint"] == "batch_hours"]
+    # 9 classes against 2 days of at most 4 classes
+    assert [(i["id"], i["demand"], i["supply"]) for i in batch_issues] == [("B0", 9, 8), ("B1", 9, 8)]
+
+
+def test_fixed_slot_clash_diagnosis_is_minimal():
+    # sessions 0 (B0) and 2 (B1) both pinned to room R0 at timeslot 0; fixed slot 2 is harmless
+    rooms, faculties, batches, subjects, fixed_slots = instance(fixed_slots=[
+        {"session_idx": 0, "timeslot": 0, "room": "R0"},
+        {"session_idx": 2, "timeslot": 0, "room": "R0"},
+        {"session_idx": 1, "timeslot": 3, "room": "R1"},
+    ])
+    diagnosis = diagnose_infeasibility(rooms, faculties, batches, subjects, TimeTableUtils(days=2, periods_per_day=6),
+                                       fixed_slots=fixed_slots, max_classes_per_day=4)
+    assert diagnosis["status"] == "INFEASIBLE" and diagnosis["minimal"]
+    # exactly the two clashing fixed slots, plus the room clash constraint they collide on
+    conflict = {(group["family"], group["key"]) for group in diagnosis["conflict"]}
+    assert {key for family, key in conflict if family == "fixed_slot"} == {0, 1}
+    assert conflict == {("fixed_slot", 0), ("fixed_slot", 1), ("room", "R0")}
+
+
+def test_repeated_fixed_slot_is_not_a_clash():
+    pin = {"session_idx": 0, "timeslot": 0, "room": "R1", "faculty": "F0"}
+    rooms, faculties, batches, subjects, fixed_slots = instance(fixed_slots=[pin, dict(pin)])
+    report = analyze_instance(rooms, faculties, batches, subjects, TimeTableUtils(days=2, periods_per_day=6),
+                              fixed_slots=fixed_slots, max_classes_per_day=4)
+    assert report["ok"], report["issues"]
+
+
+def test_session_pinned_to_two_slots_is_reported():
+    rooms, faculties, batches, subjects, fixed_slots = instance(fixed_slots=[
+        {"session_idx": 0, "timeslot": 0, "room": "R1"},
+        {"session_idx": 0, "timeslot": 0, "room": "R0"},
+    ])
+    report = analyze_instance(rooms, faculties, batches, subjects, TimeTableUtils(days=2, periods_per_day=6),
+                              fixed_slots=fixed_slots, max_classes_per_day=4)
+    assert [issue["message"] for issue in report["issues"]] == ["Fixed slots 0 and 1 pin session 0 to different slots"]
@@ -0,0 +1,88 @@
+from collections import defaultdict
+
+import pytest
+
+from heuristic_engine import solve_heuristic
+from instance_generator import generate_instance
+from optimization_engine import FixedSlot, TimeTableUtils, compute_eligibility, expand_sessions, load_instance
+
+MAX_CLASSES_PER_DAY = 4
+
+
+def with_sections_and_electives(data):
+    """Split B0's first subject into two sections and make two of B1's subjects one elective group."""
+    rows = data["curriculum"]
+    b0 = [c for c in rows if c["batch_id"] == "B0"]
+    b1 = [c for c in rows if c["batch_id"] == "B1"]
+    b0[0]["sections"] = 2
+    for c in b1[:2]:
+        c["elective_group"] = "E1"
+    return data
+
+
+def assert_valid(solution, rooms, faculties, batches, subjects, utils, fixed_slots, max_classes_per_day):
+    sessions = expand_sessions(batches, subjects)
+    eligible_room_idxs, eligible_faculty_idxs = compute_eligibility(sessions, rooms, faculties)
+    room_idx = {r.id: i for i, r in enumerate(rooms)}
+    faculty_idx = {f.id: i for i, f in enumerate(faculties)}
+
+    assert sorted(sid for sid, _, _, _ in solution) == [s["id"] for s in sessions]
+    room_at, faculty_at = set(), set()
+    batch_at = defaultdict(list)
+    faculty_day = defaultdict(int)
+    batch_day = defaultdict(set)
+    for sid, t, room_id, faculty_id in solution:
+        sess = sessions[sid]
+        day, _ = utils.timeslot_to_day_period(t)
+        assert 0 <= t < utils.T
+        assert room_idx[room_id] in eligible_room_idxs[sid]
+        assert not eligible_faculty_idxs[sid] or faculty_idx[faculty_id] in eligible_faculty_idxs[sid]
+        assert t in faculties[faculty_idx[faculty_id]].available_times
+        assert (t, room_id) not in room_at
+        assert (t, faculty_id) not in faculty_at
+        room_at.add((t, room_id))
+        faculty_at.add((t, faculty_id))
+        faculty_day[(day, faculty_id)] += 1
+        for batch_id in sess["batch_ids"]:
+            batch_at[(t, batch_id)].append(sess)
+            batch_day[(day, batch_id)].add(t)
+
+    for attending in batch_at.values():
+        # one whole-batch class, or different members of one section/elective block
+        if len(attending) > 1:
+            assert len({s["block"] for s in attending}) == 1 and attending[0]["block"] is not None
+            assert len({s["member"] for s in attending}) == len(attending)
+    assert max(faculty_day.values()) <= max_classes_per_day
+    assert max(len(timeslots) for timeslots in batch_day.values()) <= max_classes_per_day
+
+    placed = {sid: (t, room_id, faculty_id) for sid, t, room_id, faculty_id in solution}
+    for fs in fixed_slots:
+        t, room_id, faculty_id = placed[fs.session_idx]
+        assert t == fs.timeslot
+        assert fs.room is None or room_id == fs.room
+        assert fs.faculty is None or faculty_id == fs.faculty
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("curriculum", [False, True])
+def test_heuristic_respects_hard_constraints(seed, curriculum):
+    data = generate_instance(num_batches=4, num_subjects=6, num_rooms=8, num_faculties=8,
+                             max_classes_per_day=MAX_CLASSES_PER_DAY, seed=seed,
+                             subjects_per_batch=4 if curriculum else None)
+    if curriculum:
+        with_sections_and_electives(data)
+    rooms, faculties, batches, subjects, _ = load_instance(data)
+    utils = TimeTableUtils(days=5, periods_per_day=6)
+    if curriculum:
+        assert any(s["block"] is not None for s in expand_sessions(batches, subjects))
+
+    # pin every fifth class of another heuristic solution (some by timeslot only)
+    pins = solve_heuristic(rooms, faculties, batches, subjects, utils, max_classes_per_day=MAX_CLASSES_PER_DAY,
+                           seed=seed + 100)
+    fixed_slots = [FixedSlot(sid, t, room_id if i % 2 else None, faculty_id)
+                   for i, (sid, t, room_id, faculty_id) in enumerate(pins[::5])]
+
+    solution = solve_heuristic(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots,
+                               max_classes_per_day=MAX_CLASSES_PER_DAY, seed=seed)
+    assert solution is not None
+    assert_valid(solution, rooms, faculties, batches, subjects, utils, fixed_slots, MAX_CLASSES_PER_DAY)
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from instance_generator import generate_instance
+from jobs import FINISHED_STATUSES, JobManager, JobManagerUnavailable
+
+
+def test_only_one_manager_holds_the_job_lock(tmp_path):
+    lock_path = str(tmp_path / "jobs.lock")
+    manager = JobManager(max_workers=1, lock_path=lock_path)
+    try:
+        with pytest.raises(JobManagerUnavailable):
+            JobManager(max_workers=1, lock_path=lock_path)
+    finally:
+        manager.shutdown()
+    JobManager(max_workers=1, lock_path=lock_path).shutdown()  # released on shutdown
+
+
+@pytest.mark.parametrize("watchers", [0, 1])
+def test_incumbents_are_only_extracted_while_watched(watchers):
+    import threading
+
+    from jobs import _run_job
+
+    state = {"status": "queued", "variants_done": 0, "accepted": False, "incumbents": [], "latest_solution": None,
+             "metrics": None, "watchers": watchers}
+    data = generate_instance(num_batches=1, num_subjects=2, num_rooms=2, num_faculties=2)
+    solutions, _ = _run_job(data, {"num_variants": 1, "max_classes_per_day": 6,
+                                   "profile": {"max_time": 10, "workers": 1}}, state, threading.Event())
+    assert solutions and state["incumbents"]
+    if watchers:
+        index, solution = state["latest_solution"]
+        assert index < len(state["incumbents"]) and len(solution) == len(solutions[0])
+    else:
+        assert state["latest_solution"] is None
+
+
+@pytest.fixture
+def jobs_client(client):
+    """The app's test client; the job manager it starts is shut down afterwards."""
+    import app as timetable_app
+
+    yield client
+    if timetable_app.job_manager is not None:
+        timetable_app.job_manager.shutdown()
+        timetable_app.job_manager = None
+
+
+def wait_for(client, job_id, statuses, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/jobs/{job_id}").get_json()
+        if status["status"] in statuses:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {status['status']} after {timeout}s")
+
+
+def test_job_is_submitted_polled_and_fetched(jobs_client):
+    jobs_client.post("/api/import?replace=true", json=generate_instance(num_batches=1, num_subjects=2, num_rooms=2,
+                                                                        num_faculties=2))
+    payload = {"num_variants": 1, "max_classes_per_day": 6, "solver": {"max_time": 10}}
+    response = jobs_client.post("/api/jobs", json=payload)
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert wait_for(jobs_client, job_id, FINISHED_STATUSES)["status"] == "done"
+    result = jobs_client.get(f"/api/jobs/{job_id}/result").get_json()
+    assert len(result["solutions"]) == 1 and result["timetable_id"] is not None
+
+    # the same request again is answered from the result cache
+    again = jobs_client.post("/api/jobs", json=payload).get_json()["job_id"]
+    assert jobs_client.get(f"/api/jobs/{again}").get_json()["status"] == "done"
+    assert jobs_client.get(f"/api/jobs/{again}/result").get_json()["timetable_id"] == result["timetable_id"]
+    assert jobs_client.get("/api/jobs/nope").status_code == 404
+
+
+def test_cancel_stops_a_running_search(jobs_client):
+    jobs_client.post("/api/import?replace=true", json=generate_instance(num_batches=10, num_subjects=6, num_rooms=6,
+                                                                        num_faculties=6, seed=1))
+    job_id = jobs_client.post("/api/jobs", json={"num_variants": 5, "solver": {"max_time": 60}}).get_json()["job_id"]
+    wait_for(jobs_client, job_id, ("running",))
+    assert jobs_client.get(f"/api/jobs/{job_id}/result").status_code == 409
+    start = time.monotonic()
+    assert jobs_client.delete(f"/api/jobs/{job_id}").status_code == 200
+    assert wait_for(jobs_client, job_id, FINISHED_STATUSES)["status"] == "cancelled"
+    assert time.monotonic() - start < 30  # well before the search's time limit
+    assert jobs_client.get(f"/api/jobs/{job_id}/result").status_code == 200
+
+
+def test_infeasible_data_fails_the_job_with_its_report(jobs_client):
+    # 40 weekly hours don't fit 5 days x 6 periods
+    jobs_client.post("/api/import?replace=true", json={
+        "rooms": [{"id": "R0", "capacity": 30}], "faculties": [{"id": "F0"}],
+        "batches": [{"id": "B0", "size": 20}], "subjects": [{"id": "S0", "hours_per_week": 40}]})
+    job_id = jobs_client.post("/api/jobs", json={"solver": {"max_time": 10}}).get_json()["job_id"]
+    assert wait_for(jobs_client, job_id, FINISHED_STATUSES)["status"] == "failed"
+    response = jobs_client.get(f"/api/jobs/{job_id}/result")
+    assert response.status_code == 422
+    assert response.get_json()["report"]["issues"]
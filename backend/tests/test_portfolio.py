@@ -0,0 +1,56 @@
+import multiprocessing
+
+from instance_generator import generate_instance
+from optimization_engine import TimeTableUtils, load_instance
+from portfolio import DEFAULT_STRATEGIES, solve_portfolio
+
+
+def tiny_instance():
+    return load_instance({
+        "rooms": [{"id": "R0", "capacity": 40}],
+        "faculties": [{"id": "F0", "available_times": list(range(6))}],
+        "batches": [{"id": "B0", "size": 30}],
+        "subjects": [{"id": "S0", "hours_per_week": 2}],
+    })
+
+
+def test_tiny_instance_is_solved_optimally_within_the_worker_budget(monkeypatch):
+    import optimization_engine
+
+    monkeypatch.setattr(optimization_engine.os, "cpu_count", lambda: 8)
+    rooms, faculties, batches, subjects, fixed_slots = tiny_instance()
+    solution, report = solve_portfolio(rooms, faculties, batches, subjects, TimeTableUtils(days=1, periods_per_day=6),
+                                       fixed_slots=fixed_slots, profile={"max_time": 20, "workers": 2})
+    # only as many strategies as workers
+    assert [s["name"] for s in report["strategies"]] == [s["name"] for s in DEFAULT_STRATEGIES[:2]]
+    assert report["reason"] == "optimal" and report["winner"] in {"default", "heuristic-hint"}
+    # two classes outside the last two periods: no late penalty
+    assert report["objective"] == 0 and report["gap"] == 0
+    assert len(solution) == 2 and all(t < 4 for _, t, _, _ in solution)
+    assert report["elapsed"] < 20
+
+
+def larger_instance():
+    return load_instance(generate_instance(num_batches=4, num_subjects=6, num_rooms=8, num_faculties=10))
+
+
+def test_target_gap_stops_every_search():
+    rooms, faculties, batches, subjects, fixed_slots = larger_instance()
+    solution, report = solve_portfolio(rooms, faculties, batches, subjects, TimeTableUtils(days=5, periods_per_day=6),
+                                       fixed_slots=fixed_slots, max_classes_per_day=6, target_gap=1.0,
+                                       profile={"max_time": 60, "workers": 2})
+    assert report["reason"] == "target_gap" and solution is not None
+    assert report["winner"] is not None and report["gap"] <= 1.0
+    assert report["elapsed"] < 30
+
+
+def test_cancel_stops_every_search():
+    rooms, faculties, batches, subjects, fixed_slots = larger_instance()
+    with multiprocessing.Manager() as manager:
+        cancel_event = manager.Event()
+        cancel_event.set()
+        _, report = solve_portfolio(rooms, faculties, batches, subjects, TimeTableUtils(days=5, periods_per_day=6),
+                                    fixed_slots=fixed_slots, max_classes_per_day=6, cancel_event=cancel_event,
+                                    profile={"max_time": 60, "workers": 2})
+    assert report["reason"] == "cancelled"
+    assert report["elapsed"] < 30
@@ -0,0 +1,102 @@
+import gzip
+import json
+
+import pytest
+
+from heuristic_engine import solve_heuristic
+from optimization_engine import TimeTableUtils, expand_sessions, load_instance
+from serialization import compact_payload, stream_compact
+
+
+def generated():
+    """Solutions, session map and batch sizes of a curriculum with a combined class and split sections."""
+    rooms, faculties, batches, subjects, fixed_slots = load_instance({
+        "rooms": [{"id": f"R{i}", "capacity": 80} for i in range(3)],
+        "faculties": [{"id": f"F{i}", "available_times": list(range(12))} for i in range(3)],
+        "batches": [{"id": "B0", "size": 30}, {"id": "B1", "size": 40}, {"id": "B2", "size": 50}],
+        "subjects": [{"id": "S0", "hours_per_week": 2}, {"id": "S1", "hours_per_week": 1},
+                     {"id": "S2", "hours_per_week": 1, "allowed_rooms": ["R2"], "eligible_faculties": ["F1"]}],
+        "curriculum": [{"batch_id": "B0", "subject_id": "S0", "combined_with": ["B1"]},
+                       {"batch_id": "B1", "subject_id": "S0"},
+                       {"batch_id": "B1", "subject_id": "S2"},
+                       {"batch_id": "B2", "subject_id": "S1", "sections": 2},
+                       {"batch_id": "B2", "subject_id": "S2"}],
+    })
+    return solve(rooms, faculties, batches, subjects, fixed_slots)
+
+
+def solve(rooms, faculties, batches, subjects, fixed_slots):
+    """(solutions, session_map, batch_sizes) of two heuristic variants."""
+    utils = TimeTableUtils(days=2, periods_per_day=6)
+    solutions = [solve_heuristic(rooms, faculties, batches, subjects, utils, fixed_slots=fixed_slots, seed=seed)
+                 for seed in range(2)]
+    assert all(solutions)
+    return solutions, {s["id"]: s for s in expand_sessions(batches, subjects)}, {b.id: b.size for b in batches}
+
+
+def decode(doc):
+    """The (session_id, timeslot, room_id, faculty_id) lists and per-session fields of a compact document."""
+    solutions = [sorted(zip(s["session"], s["timeslot"], [doc["rooms"][r] for r in s["room"]],
+                            [doc["faculties"][f] for f in s["faculty"]])) for s in doc["solutions"]]
+    batch_ids, sessions = doc["batches"]["id"], doc["sessions"]
+    session_fields = [{"batch_id": batch_ids[b], "subject_id": doc["subjects"]["id"][s],
+                       "size": sessions["size"][sid] if "size" in sessions else doc["batches"]["size"][b],
+                       "batch_ids": [batch_ids[i] for i in sessions["batches"][sid]] if "batches" in sessions
+                       else [batch_ids[b]]}
+                      for sid, (b, s) in enumerate(zip(sessions["batch"], sessions["subject"]))]
+    return solutions, session_fields
+
+
+def expected_fields(session_map):
+    return [{"batch_id": s["batch_id"], "subject_id": s["subject_id"], "size": s["size"], "batch_ids": s["batch_ids"]}
+            for _, s in sorted(session_map.items())]
+
+
+def test_compact_payload_round_trip():
+    solutions, session_map, batch_sizes = generated()
+    doc = compact_payload(solutions, session_map, extra={"timetable_id": 7}, batch_sizes=batch_sizes)
+    assert doc["format"] == "compact-v1" and doc["timetable_id"] == 7
+    decoded, fields = decode(doc)
+    assert decoded == [sorted(s) for s in solutions]
+    assert fields == expected_fields(session_map)
+    assert ["B0", "B1"] in [f["batch_ids"] for f in fields]  # the combined class, for 70 students
+    assert {f["size"] for f in fields if f["batch_id"] == "B2" and f["subject_id"] == "S1"} == {25}
+    assert dict(zip(doc["batches"]["id"], doc["batches"]["size"])) == {"B0": 30, "B1": 40, "B2": 50}
+
+
+def test_compact_payload_keeps_size_overrides():
+    # B0's S1 class is for 25 of its 40 students, its S2 class for all of them
+    solutions, session_map, batch_sizes = solve(*load_instance({
+        "rooms": [{"id": "R0", "capacity": 40}],
+        "faculties": [{"id": "F0", "available_times": list(range(12))}],
+        "batches": [{"id": "B0", "size": 40}],
+        "subjects": [{"id": "S1", "hours_per_week": 1}, {"id": "S2", "hours_per_week": 1}],
+        "curriculum": [{"batch_id": "B0", "subject_id": "S1", "size": 25}, {"batch_id": "B0", "subject_id": "S2"}],
+    }))
+    doc = compact_payload(solutions, session_map, batch_sizes=batch_sizes)
+    assert doc["batches"]["size"] == [40] and doc["sessions"]["size"] == [25, 40]
+    assert decode(doc)[1] == expected_fields(session_map)
+    # without the batch records every session's size is written
+    assert decode(compact_payload(solutions, session_map))[1] == expected_fields(session_map)
+
+
+@pytest.mark.parametrize("use_gzip", [False, True])
+@pytest.mark.parametrize("encoding", ["json", "msgpack"])
+def test_stream_compact_matches_payload(encoding, use_gzip):
+    if encoding == "msgpack":
+        msgpack = pytest.importorskip("msgpack")
+    solutions, session_map, batch_sizes = generated()
+    body = b"".join(stream_compact(solutions, session_map, extra={"timetable_id": 7}, encoding=encoding,
+                                   gzip=use_gzip, batch_sizes=batch_sizes))
+    if use_gzip:
+        body = gzip.decompress(body)
+    doc = json.loads(body) if encoding == "json" else msgpack.unpackb(body)
+    assert doc == compact_payload(solutions, session_map, extra={"timetable_id": 7}, batch_sizes=batch_sizes)
+    assert list(doc)[:2] == ["format", "timetable_id"]
+    decoded, fields = decode(doc)
+    assert decoded == [sorted(s) for s in solutions] and fields == expected_fields(session_map)
+
+
+def test_stream_compact_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        stream_compact([], {}, encoding="xml")
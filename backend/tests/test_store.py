@@ -0,0 +1,81 @@
+import pytest
+from flask import Flask
+
+import store
+from models import db
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_import_keeps_insertion_order(app):
+    for batch_id in ("B9", "B1", "B0"):
+        store.import_data({"batches": [{"id": batch_id, "size": 30}]})
+    assert [b["id"] for b in store.load_data()["batches"]] == ["B9", "B1", "B0"]
+
+
+def test_upsert_replaces_row_in_place(app):
+    store.import_data({"batches": [{"id": "B0", "size": 30}, {"id": "B1", "size": 40}]})
+    store.import_data({"batches": [{"id": "B0", "size": 50}, {"id": "B2", "size": 20}]})
+    batches = store.load_data()["batches"]
+    assert [(b["id"], b["size"]) for b in batches] == [("B0", 50), ("B1", 40), ("B2", 20)]
+
+
+def test_curriculum_upsert_by_batch_and_subject(app):
+    store.import_data({"curriculum": [{"batch_id": "B0", "subject_id": "S1"},
+                                      {"batch_id": "B0", "subject_id": "S2", "sections": 2}]})
+    store.import_data({"curriculum": [{"batch_id": "B0", "subject_id": "S2", "hours_per_week": 5}]})
+    rows = {(c["batch_id"], c["subject_id"]): c for c in store.load_data()["curriculum"]}
+    assert len(rows) == 2
+    assert rows[("B0", "S2")]["hours_per_week"] == 5 and rows[("B0", "S2")]["sections"] == 1
+
+
+def test_load_data_round_trip(app):
+    data = {
+        "rooms": [{"id": "R0", "name": "Room 0", "capacity": 40, "type": "classroom"}],
+        "faculties": [{"id": "F0", "name": "F0", "subjects": ["S0"], "available_times": [0, 1, 2]}],
+        "batches": [{"id": "B1", "name": "B1", "size": 30}, {"id": "B0", "name": "B0", "size": 20}],
+        "subjects": [{"id": "S0", "name": "S0", "hours_per_week": 2, "allowed_rooms": ["R0"],
+                      "eligible_faculties": ["F0"]}],
+        "fixed_slots": [{"session_idx": 0, "timeslot": 1, "room": "R0", "faculty": None}],
+    }
+    store.import_data(data, replace=True)
+    loaded = store.load_data()
+    assert {kind: loaded[kind] for kind in data} == data
+    assert loaded["curriculum"] == []
+
+
+def test_save_timetable_reuses_only_on_request(app):
+    session_map = {0: {"batch_id": "B0", "subject_id": "S0"}}
+    first = store.save_timetable([], session_map, 5, 6, fingerprint="abc")
+    second = store.save_timetable([[(0, 3, "R0", "F0")]], session_map, 5, 6, fingerprint="abc")
+    assert second != first
+    assert store.save_timetable([[(0, 3, "R0", "F0")]], session_map, 5, 6, fingerprint="abc", reuse=True) == second
+    assert len(store.timetable_entries(second)) == 1
+    assert store.timetable_info(first) is not None  # older timetables stay readable by id
+
+
+def test_timetable_keeps_its_rooms_across_imports(app):
+    store.import_data({"rooms": [{"id": "R1", "capacity": 30}, {"id": "R0", "capacity": 30}]})
+    timetable_id = store.save_timetable([[(0, 3, "R0", "F0")]], {0: {"batch_id": "B0", "subject_id": "S0"}}, 5, 6,
+                                        room_ids=[r["id"] for r in store.load_data()["rooms"]])
+    store.import_data({"rooms": [{"id": "R2", "capacity": 30}]})
+    assert store.timetable_info(timetable_id)["room_ids"] == ["R0", "R1"]
+    assert store.timetable_info(store.save_timetable([], {}, 5, 6))["room_ids"] is None
+
+
+def test_fixed_slot_reimport_replaces_the_pin(app):
+    pin = {"session_idx": 3, "timeslot": 1, "room": "R0", "faculty": None}
+    store.import_data({"fixed_slots": [pin, {"session_idx": 4, "timeslot": 2, "room": None, "faculty": "F0"}]})
+    store.import_data({"fixed_slots": [dict(pin, timeslot=5)]})
+    assert store.load_data()["fixed_slots"] == [dict(pin, timeslot=5),
+                                                {"session_idx": 4, "timeslot": 2, "room": None, "faculty": "F0"}]
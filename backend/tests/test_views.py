@@ -0,0 +1,57 @@
+import pytest
+
+from views import TimetableViews
+
+
+@pytest.fixture
+def timetable_id(client):
+    """A stored one-variant timetable, 1 day x 2 periods: a combined class at 0 and one class at 1."""
+    import app as timetable_app
+    import store
+
+    session_map = {0: {"batch_id": "B0", "batch_ids": ["B0", "B1"], "subject_id": "S0"},
+                   1: {"batch_id": "B0", "subject_id": "S1"}}
+    with timetable_app.app.app_context():
+        return store.save_timetable([[(0, 0, "R0", "F0"), (1, 1, "R1", "F0")]], session_map, 1, 2,
+                                    room_ids=["R0", "R1", "R2"])
+
+
+def test_entity_view_lists_combined_class_once_outside_batches(client, timetable_id):
+    batches = client.get(f"/api/timetables/{timetable_id}/views/batch").get_json()
+    assert [(item["key"], len(item["entries"])) for item in batches["items"]] == [("B0", 2), ("B1", 1)]
+    faculty = client.get(f"/api/timetables/{timetable_id}/views/faculty/F0").get_json()
+    assert [e["session_id"] for e in faculty["entries"]] == [0, 1] and faculty["total"] == 2
+
+
+def test_view_pages_and_errors(client, timetable_id):
+    page = client.get(f"/api/timetables/{timetable_id}/views/batch?page=2&per_page=1").get_json()
+    assert (page["total"], [item["key"] for item in page["items"]]) == (2, ["B1"])
+    assert client.get(f"/api/timetables/{timetable_id}/views/batch?page=9").get_json()["items"] == []
+    assert client.get(f"/api/timetables/{timetable_id}/views/nope").status_code == 404
+    assert client.get(f"/api/timetables/{timetable_id}/views/room/R9").status_code == 404
+    assert client.get(f"/api/timetables/{timetable_id}/views/batch?variant=1").status_code == 404
+
+
+def test_matching_etag_answers_not_modified(client, timetable_id):
+    url = f"/api/timetables/{timetable_id}/views/room"
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    cached = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304 and cached.data == b""
+    other_page = client.get(url + "?page=2", headers={"If-None-Match": first.headers["ETag"]})
+    assert other_page.status_code == 200 and other_page.headers["ETag"] != first.headers["ETag"]
+
+
+def test_free_rooms_use_the_timetables_rooms(client, timetable_id):
+    url = f"/api/timetables/{timetable_id}/free-rooms"
+    assert client.get(url + "?timeslot=0").get_json() == {"timeslot": 0, "rooms": ["R1", "R2"]}
+    assert client.get(url + "?timeslot=1").get_json() == {"timeslot": 1, "rooms": ["R0", "R2"]}
+    assert client.get(url + "?timeslot=2").status_code == 400
+    assert client.get(url).status_code == 400
+
+
+def test_rendered_pages_are_bounded():
+    views = TimetableViews([], ["R0"], 1, max_rendered=2)
+    for page in range(1, 100):
+        views.render(("batch", page, 50), lambda: views.entity_page("batch", page, 50))
+    assert list(views._rendered) == [("batch", 98, 50), ("batch", 99, 50)]
@@ -0,0 +1,116 @@
+"""
+Precomputed per-entity views of a stored timetable variant.
+
+TimetableViews groups one variant's entries by batch, faculty, room and day and
+derives the free rooms per timeslot, once. Recently rendered pages are memoized
+as JSON bytes (a bounded LRU, since page numbers are client input), and every
+page has an ETag derived from a digest of the variant's content, so a
+conditional GET that matches is answered without serializing anything.
+ViewCache keeps the views of the most recently used variants.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+
+VIEW_KINDS = ("batch", "faculty", "room", "day")
+
+
+class TimetableViews:
+    """
+    entries: dicts as returned by store.timetable_entries (ordered by timeslot); a combined
+        class has one entry per batch and is listed once in the other views
+    room_ids: every room, for the free-room view
+    num_timeslots: days * periods_per_day
+    max_rendered: how many rendered pages are kept
+    """
+
+    def __init__(self, entries, room_ids, num_timeslots, max_rendered=256):
+        self.groups = {kind: defaultdict(list) for kind in VIEW_KINDS}
+        used = defaultdict(set)
+        seen = set()
+        for entry in entries:
+            self.groups["batch"][entry["batch_id"]].append(entry)
+            if entry["session_id"] in seen:
+                continue  # further batches of a combined class
+            seen.add(entry["session_id"])
+            self.groups["faculty"][entry["faculty_id"]].append(entry)
+            self.groups["room"][entry["room_id"]].append(entry)
+            self.groups["day"][str(entry["day"])].append(entry)
+            used[entry["timeslot"]].add(entry["room_id"])
+        self.keys = {kind: sorted(groups) for kind, groups in self.groups.items()}
+        self.free_rooms = [[r for r in room_ids if r not in used[t]] for t in range(num_timeslots)]
+
+        blob = json.dumps([entries, room_ids, num_timeslots], sort_keys=True, separators=(",", ":"))
+        self.digest = hashlib.sha1(blob.encode("utf-8")).hexdigest()
+        self.max_rendered = max_rendered
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, *parts):
+        """ETag for one page of this variant; cheap, nothing is serialized."""
+        return hashlib.sha1(":".join([self.digest] + [str(p) for p in parts]).encode("utf-8")).hexdigest()
+
+    def render(self, cache_key, build):
+        """JSON bytes of build(), memoized per cache_key for the most recently used pages."""
+        with self._lock:
+            body = self._rendered.get(cache_key)
+            if body is not None:
+                self._rendered.move_to_end(cache_key)
+                return body
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._rendered[cache_key] = body
+            self._rendered.move_to_end(cache_key)
+            while len(self._rendered) > self.max_rendered:
+                self._rendered.popitem(last=False)
+        return body
+
+    def has_key(self, kind, key):
+        return key in self.groups[kind]
+
+    def entity_page(self, kind, page, per_page):
+        """Page over the entities of `kind`, each with all its entries."""
+        keys = self.keys[kind]
+        chunk = keys[(page - 1) * per_page:page * per_page]
+        return {"view": kind, "page": page, "per_page": per_page, "total": len(keys),
+                "items": [{"key": key, "entries": self.groups[kind][key]} for key in chunk]}
+
+    def entry_page(self, kind, key, page, per_page):
+        """Page over the entries of one entity."""
+        entries = self.groups[kind][key]
+        return {"view": kind, "key": key, "page": page, "per_page": per_page, "total": len(entries),
+                "entries": entries[(page - 1) * per_page:page * per_page]}
+
+    def free_rooms_at(self, timeslot):
+        return {"timeslot": timeslot, "rooms": self.free_rooms[timeslot]}
+
+
+class ViewCache:
+    """LRU of TimetableViews keyed by (timetable_id, variant)."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Cached views for key, else build(); a None result (e.g. unknown timetable) is not cached."""
+        with self._lock:
+            views = self._entries.get(key)
+            if views is not None:
+                self._entries.move_to_end(key)
+                return views
+        views = build()
+        if views is None:
+            return None
+        with self._lock:
+            self._entries[key] = views
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return views
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()